@@ -0,0 +1,110 @@
+"""
+-------------------------------------------------
+    Project: Sneaktime
+    Standard: 91906 (AS3.7)
+    School: Tauranga Boys' College
+    Author: Michael Ren
+    Date: 05 OCT 2021
+    Python: 3.9.6
+    License: MIT
+-------------------------------------------------
+"""
+
+import os
+import pygame as pg
+import theme
+from settings import *
+
+# Folders of sprites that depend on the theme
+THEMED_FOLDERS = ["characters", "powerups", "items", "traps", "maps"]
+
+# Sprites in resources/base that are greyscale and get recolored with a theme color,
+# black becomes the theme color and white stays white. Everything else looks the
+# same in every theme and is used as it is.
+PALETTE = {
+    ("characters", "player.png"): "primary",
+    ("characters", "boss.png"): "primary",
+    ("powerups", "armour.png"): "primary",
+    ("powerups", "disguise.png"): "primary",
+    ("powerups", "shotgun.png"): "primary",
+    ("items", "key.png"): "third",
+}
+
+# Hand painted sprites in resources/overrides/<folder>/<theme> are used instead of
+# the recolored ones. The boss in every theme and the red key have shading that
+# a single color can't reproduce.
+
+# Every image and font is only read from disk once and the same surface is
+# handed out to everything that uses it, so the surfaces must never be drawn on
+class AssetManager:
+    def __init__(self):
+        self.images = {}
+        self.fonts = {}
+        self.hits = 0
+        self.misses = 0
+
+    def image(self, path):
+        img = self.images.get(path)
+        if img is None:
+            self.misses += 1
+            img = pg.image.load(path).convert_alpha()
+            self.images[path] = img
+        else:
+            self.hits += 1
+        return img
+
+    # A sprite for a theme, recolored from the base set unless there is a hand painted override
+    def themed_image(self, theme_name, folder, file):
+        key = (theme_name, folder, file)
+        img = self.images.get(key)
+        if img is None:
+            override_path = os.path.join(*[rs_dir, "overrides", folder, theme_name, file])
+            if os.path.exists(override_path):
+                img = self.image(override_path)
+            else:
+                img = self.image(os.path.join(*[rs_dir, "base", folder, file]))
+                color_key = PALETTE.get((folder, file))
+                if color_key:
+                    img = recolor(img, theme.THEMES[theme_name][color_key])
+            self.images[key] = img
+        else:
+            self.hits += 1
+        return img
+
+    def font(self, path, size):
+        key = (path, size)
+        font = self.fonts.get(key)
+        if font is None:
+            self.misses += 1
+            font = pg.font.Font(path, size)
+            self.fonts[key] = font
+        else:
+            self.hits += 1
+        return font
+
+    # Load every sprite of a theme that isn't in the cache yet
+    def load_theme(self, theme_name):
+        for folder in THEMED_FOLDERS:
+            for file in sorted(os.listdir(os.path.join(*[rs_dir, "base", folder]))):
+                if file.endswith(".png"):
+                    self.themed_image(theme_name, folder, file)
+
+    def stats(self):
+        return {
+            "images": len(self.images),
+            "image_bytes": sum(img.get_width() * img.get_height() * img.get_bytesize() for img in self.images.values()),
+            "fonts": len(self.fonts),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+# Map the grey level of every pixel from black -> color to white -> white, alpha is kept
+def recolor(img, color):
+    img = img.copy()
+    img.fill([255 - c for c in color], special_flags=pg.BLEND_RGB_MULT)
+    img.fill(color, special_flags=pg.BLEND_RGB_ADD)
+    return img
+
+
+manager = AssetManager()
@@ -0,0 +1,207 @@
+"""
+-------------------------------------------------
+    Project: Sneaktime
+    Standard: 91906 (AS3.7)
+    School: Tauranga Boys' College
+    Author: Michael Ren
+    Date: 05 OCT 2021
+    Python: 3.9.6
+    License: MIT
+-------------------------------------------------
+"""
+
+import sys, json, time, platform
+import importlib.metadata
+import numpy as np
+import pygame as pg
+import controls
+import rng
+
+# Plays the same scripted run through every level, once headless (update only) and
+# once rendered (update and draw), and saves how long the frames and level loads took.
+# Run it before and after upgrading pygame or collision and compare the two files.
+#
+# Usage:
+#     python main.py -d --bench --frames 600 --bench-out after.json    (add --replay run.rec to time a recording too)
+#     python bench.py compare before.json after.json --threshold 10
+
+# Version 2 stopped timing frames after the scripted player dies and reports memory once per run
+VERSION = 2
+SEED = 1
+
+# Metrics that are worse when they go up
+METRICS = ["load_ms", "p50_ms", "p95_ms", "p99_ms", "max_ms"]
+
+# Peak memory of the whole process so far, in MB. It only ever goes up, so it is
+# reported once for the whole run rather than per level.
+def get_peak_rss():
+    try:
+        import resource
+    except ImportError:
+        # Not available on Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Bytes on macOS, kilobytes everywhere else
+    return peak / 1024 / 1024 if sys.platform == "darwin" else peak / 1024
+
+def get_versions():
+    versions = {"python": platform.python_version(), "platform": platform.platform()}
+    for package in ["pygame", "collision", "numpy"]:
+        try:
+            versions[package] = importlib.metadata.version(package)
+        except importlib.metadata.PackageNotFoundError:
+            versions[package] = None
+    return versions
+
+def get_stats(times, load=None):
+    ms = np.array(times) * 1000
+    stats = {
+        "frames": len(times),
+        "p50_ms": float(np.percentile(ms, 50)),
+        "p95_ms": float(np.percentile(ms, 95)),
+        "p99_ms": float(np.percentile(ms, 99)),
+        "max_ms": float(ms.max()),
+        "mean_ms": float(ms.mean()),
+    }
+    if load is not None:
+        stats["load_ms"] = load * 1000
+    return stats
+
+def step(game, dt, draw):
+    pg.event.pump()
+    game.update(dt)
+    if draw:
+        game.render()
+        pg.display.flip()
+
+def start_level(game, n):
+    start = time.perf_counter()
+    game.level_manager.switch(n)
+    game.level_manager.load_level()
+    load = time.perf_counter() - start
+    game.mode = "main"
+    # Dying or finishing the last run slowed the game down
+    game.speed = game.target_speed = 1
+    return load
+
+# Only frames where the scripted player is still playing the level are timed
+def is_playing(game):
+    p = game.player
+    return game.mode == "main" and p.alive and not p.completed_level
+
+def run_level(game, n, frames, dt, draw):
+    import mapcache
+    rng.seed(SEED + n)
+    # Every load reads the compiled map from disk instead of the copy from the last run
+    mapcache.loaded.clear()
+    load = start_level(game, n)
+
+    times = []
+    restarts = 0
+    frame = 0
+    while len(times) < frames:
+        if not is_playing(game):
+            # The player died or reached the exit, start the level again instead of timing the
+            # death or level complete screens
+            start_level(game, n)
+            restarts += 1
+        game.input.set_pressed(controls.get_script_keys(frame))
+        start = time.perf_counter()
+        step(game, dt, draw)
+        times.append(time.perf_counter() - start)
+        frame += 1
+    stats = get_stats(times, load)
+    stats["restarts"] = restarts
+    return stats
+
+def run_replay(game, dt, draw):
+    times = []
+    while game.recorder:
+        start = time.perf_counter()
+        step(game, dt, draw)
+        times.append(time.perf_counter() - start)
+    return get_stats(times)
+
+# make_game(input_source, replay_file) creates a new GameManager
+def run(make_game, frames, path):
+    # The game is only imported when it is benchmarked, comparing results works without a display or sound
+    import level
+    import assets
+    from settings import tick_rate, replay_path
+    dt = 1 / tick_rate
+    results = {}
+    for mode, draw in (("headless", False), ("rendered", True)):
+        results[mode] = {}
+        game = make_game(controls.ScriptedInput(), None)
+        for n, level_obj in enumerate(level.LEVELS):
+            stats = run_level(game, n, frames, dt, draw)
+            stats["map"] = level_obj["path"]
+            results[mode][str(n)] = stats
+            print(f"{mode:>8} level {n}: load {stats['load_ms']:6.1f}ms  p50 {stats['p50_ms']:5.2f}ms  p95 {stats['p95_ms']:5.2f}ms  p99 {stats['p99_ms']:5.2f}ms  max {stats['max_ms']:6.2f}ms  restarts {stats['restarts']}")
+        if replay_path:
+            stats = run_replay(make_game(None, replay_path), dt, draw)
+            results[mode]["replay"] = stats
+            print(f"{mode:>8} replay:  p50 {stats['p50_ms']:5.2f}ms  p95 {stats['p95_ms']:5.2f}ms  p99 {stats['p99_ms']:5.2f}ms  max {stats['max_ms']:6.2f}ms")
+
+    data = {
+        "version": VERSION,
+        "versions": get_versions(),
+        "frames": frames,
+        "tick_rate": tick_rate,
+        "seed": SEED,
+        "results": results,
+        "peak_rss_mb": get_peak_rss(),
+        "assets": assets.manager.stats(),
+    }
+    with open(path, "w") as f:
+        json.dump(data, f, indent=4)
+    print("Saved results to", path)
+    return data
+
+# Lists every metric that got more than threshold percent worse from old to new
+def compare(old, new, threshold=10):
+    regressions = []
+    for mode, entries in new["results"].items():
+        for name, stats in entries.items():
+            before = old["results"].get(mode, {}).get(name)
+            if not before:
+                continue
+            for metric in METRICS:
+                a = before.get(metric)
+                b = stats.get(metric)
+                if not a or b is None:
+                    continue
+                change = (b - a) / a * 100
+                flag = "REGRESSION" if change > threshold else ""
+                print(f"{mode:>8} {name:>6} {metric:>12}: {a:9.2f} -> {b:9.2f} ({change:+6.1f}%) {flag}")
+                if flag:
+                    regressions.append((mode, name, metric, change))
+    a = old.get("peak_rss_mb")
+    b = new.get("peak_rss_mb")
+    if a and b is not None:
+        change = (b - a) / a * 100
+        flag = "REGRESSION" if change > threshold else ""
+        print(f"{'run':>15} {'peak_rss_mb':>12}: {a:9.2f} -> {b:9.2f} ({change:+6.1f}%) {flag}")
+        if flag:
+            regressions.append(("run", None, "peak_rss_mb", change))
+    return regressions
+
+
+if __name__ == "__main__":
+    if "compare" in sys.argv:
+        i = sys.argv.index("compare")
+        old_path, new_path = sys.argv[i + 1], sys.argv[i + 2]
+        threshold = float(sys.argv[sys.argv.index("--threshold") + 1]) if "--threshold" in sys.argv else 10
+        with open(old_path) as f:
+            old = json.load(f)
+        with open(new_path) as f:
+            new = json.load(f)
+        print("Old:", old["versions"])
+        print("New:", new["versions"])
+        if old.get("version") != new.get("version"):
+            print(f"Results are from different benchmark versions ({old.get('version')} and {new.get('version')}), they may not be comparable")
+        regressions = compare(old, new, threshold)
+        print(f"{len(regressions)} regressions over {threshold}%")
+        sys.exit(1 if regressions else 0)
+    else:
+        print("Usage: python bench.py compare before.json after.json [--threshold 10]")
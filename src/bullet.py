@@ -1,4 +1,3 @@
-
 """
 -------------------------------------------------
     Project: Sneaktime
@@ -11,55 +10,122 @@
 -------------------------------------------------
 """
 
+import math
+import numpy as np
 import pygame as pg
-from collision import *
+import circlecache
 from settings import *
 
-class Bullet:
-    radius = 10
+RADIUS = 10
+SPEED = 800
+LIFESPAN = 1
+
+# Who fired the bullet, player bullets hit enemies and enemy bullets hit the player
+TAGS = ["player", "enemy"]
+PLAYER = 0
+ENEMY = 1
 
-    def __init__(self, game, x, y, angle, tag):
+# Every bullet in flight, stored as columns of preallocated arrays like the particles
+class ProjectileManager:
+    def __init__(self, game, capacity=64):
         self.game = game
-        self.pos = pg.Vector2(x, y)
-        self.speed = 800
-        self.angle = angle
-        self.lifespan = 1
-        self.counter = 0
-        self.collided = False
-        self.tag = tag
-        self.colors = {
-            "player": self.game.get_color("primary"),
-            "enemy": self.game.get_color("secondary"),
-        }
-        self.collision_obj = Circle(Vector(*self.pos), self.radius)
+        self.count = 0
+        self.allocate(capacity)
+
+    def allocate(self, capacity):
+        self.capacity = capacity
+        self.pos = np.zeros((capacity, 2))
+        self.prev_pos = np.zeros((capacity, 2)) # Position before the last update, for drawing in between
+        self.vel = np.zeros((capacity, 2))
+        self.counter = np.zeros(capacity)
+        self.tag = np.zeros(capacity, np.uint8)
+
+    def grow(self):
+        old = (self.pos, self.prev_pos, self.vel, self.counter, self.tag)
+        self.allocate(self.capacity * 2)
+        n = self.count
+        for new, a in zip((self.pos, self.prev_pos, self.vel, self.counter, self.tag), old):
+            new[:n] = a[:n]
+
+    def add(self, x, y, angle, tag):
+        if self.count == self.capacity:
+            self.grow()
+        i = self.count
+        self.pos[i] = (x, y)
+        self.prev_pos[i] = (x, y)
+        # The direction never changes, so the velocity is only worked out once
+        self.vel[i] = (math.cos(angle) * SPEED, math.sin(angle) * SPEED)
+        self.counter[i] = 0
+        self.tag[i] = TAGS.index(tag)
+        self.count += 1
+
+    def get_colors(self):
+        return [self.game.get_color("primary"), self.game.get_color("secondary")]
 
     def update(self, dt):
-        self.pos.x += math.cos(self.angle) * self.speed * dt
-        self.pos.y += math.sin(self.angle) * self.speed * dt
-        self.counter += dt
-        
-        # Collision with the map
-        self.collision_obj.pos.x = self.pos.x
-        self.collision_obj.pos.y = self.pos.y
-        if self.game.level_manager.current_map().poly_collide(self.collision_obj):
-            self.collided = True
+        # Bullets fired while hits are being handled (the boss shoots back) start moving next frame
+        n = self.count
+        if not n:
+            return
+        pos = self.pos[:n]
+        tag = self.tag[:n]
+        self.prev_pos[:n] = pos
+        self.counter[:n] += dt
+
+        # Collision with the map, bullets that hit a wall stop where they touch it
+        collided, pos[:] = self.game.level_manager.current_map().sweep_circles(pos, pos + self.vel[:n] * dt, RADIUS)
+
+        # Collision with enemies, tested all at once against the enemies near any bullet,
+        # a bullet only hits the first enemy it overlaps
+        shots = np.flatnonzero(tag == PLAYER)
+        if len(shots):
+            spatial_hash = self.game.spatial_hash
+            nearby = spatial_hash.query_points(pos[shots], RADIUS)
+            if nearby:
+                enemies = [spatial_hash.entities[j] for j in nearby]
+                circles = np.array([(c.pos.x, c.pos.y, c.radius) for c in (e.collision_obj for e in enemies)])
+                d = pos[shots, None, :] - circles[None, :, :2]
+                hits = (d ** 2).sum(axis=2) <= (circles[:, 2] + RADIUS) ** 2
+                hit = hits.any(axis=1)
+                for i, j in zip(shots[hit].tolist(), hits[hit].argmax(axis=1).tolist()):
+                    collided[i] = True
+                    enemies[j].on_collision_with_bullet(nearby[j])
+
+        # Collision with the player
+        shots = np.flatnonzero(tag == ENEMY)
+        if len(shots):
+            player = self.game.player.collision_obj
+            d = pos[shots] - (player.pos.x, player.pos.y)
+            reach = player.radius + RADIUS
+            for i in shots[(d ** 2).sum(axis=1) <= reach ** 2].tolist():
+                collided[i] = True
+                self.game.player.die("Try to dodge the bullets next time!")
 
-        # Collision with enemies
-        for i, e in enumerate(self.game.enemy_manager.entities):
-            if self.tag == "player" and collide(self.collision_obj, e.collision_obj):
-                self.collided = True
-                e.on_collision_with_bullet(i)
-                break
-                
-        if self.tag == "enemy" and collide(self.collision_obj, self.game.player.collision_obj):
-            self.collided = True
-            self.game.player.die("Try to dodge the bullets next time!")
+        # Explode the bullets that hit something or ran out of time
+        dead = collided | (self.counter[:n] > LIFESPAN)
+        if dead.any():
+            colors = self.get_colors()
+            for (x, y), t in zip(pos[dead].tolist(), tag[dead].tolist()):
+                self.game.particle_manager.generate(x, y, colors[t])
+                sound_effects["explode"].play()
+            # Keep the bullets that are still flying, and any that were fired during this update
+            keep = np.concatenate((np.flatnonzero(~dead), np.arange(n, self.count)))
+            for a in (self.pos, self.prev_pos, self.vel, self.counter, self.tag):
+                a[:len(keep)] = a[keep]
+            self.count = len(keep)
 
-    def is_dead(self):
-        if self.collided or self.counter > self.lifespan:
-            self.game.particle_manager.generate(*self.pos, self.colors[self.tag]);
-            sound_effects["explode"].play()
-            return True
+    def reset(self):
+        self.count = 0
 
     def draw(self, screen):
-        pg.draw.circle(screen, self.colors[self.tag], self.pos, self.radius)
\ No newline at end of file
+        n = self.count
+        if n:
+            colors = self.get_colors()
+            offset = self.game.camera.offset
+            prev = self.prev_pos[:n]
+            pos = prev + (self.pos[:n] - prev) * self.game.alpha
+            # Positions are truncated like pg.draw.circle does
+            x = (pos[:, 0] - offset.x).astype(int) - RADIUS
+            y = (pos[:, 1] - offset.y).astype(int) - RADIUS
+            sprites = [circlecache.cache.get(c, RADIUS) for c in colors]
+            screen.blits([(sprites[t], (px, py)) for t, px, py in zip(self.tag[:n].tolist(), x.tolist(), y.tolist())], doreturn=False)
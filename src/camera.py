@@ -11,14 +11,17 @@
 -------------------------------------------------
 """
 
-import random
 import pygame as pg
+import rng
 from settings import *
 
 class Camera:
     def __init__(self, game):
         self.game = game
         self.pos = pg.Vector2()
+        self.prev_pos = pg.Vector2()
+        # Top left corner of the view in whole pixels, world positions are drawn relative to it
+        self.offset = pg.Vector2()
         self.scale = pg.Vector2(1, 1)
         self.vel = pg.Vector2()
         self.margin = 200
@@ -29,6 +32,7 @@ class Camera:
         self.do_shake = False
         self.shake_amount = 0
         self.shake_displacement = pg.Vector2()
+        self.random = rng.get("camera")
 
     def shake(self, amount):
         self.do_shake = True
@@ -58,8 +62,22 @@ class Camera:
         self.vel.y = self.vel.y if self.vel.y < self.max_vel else self.max_vel
         self.vel.y = self.vel.y if self.vel.y < self.max_vel else self.max_vel
 
+    # Convert a world position to a position on the view sized screen
+    def apply(self, pos):
+        return (pos[0] - self.offset.x, pos[1] - self.offset.y)
+
+    def apply_rect(self, rect):
+        return pg.Rect(rect).move(-self.offset.x, -self.offset.y)
+
+    # Drawn part way between the last two positions when the game runs in fixed steps
+    def interpolate(self):
+        pos = self.game.lerp(self.prev_pos, self.pos)
+        self.offset = pg.Vector2(int(pos.x), int(pos.y))
+
     def reset(self):
         self.pos = pg.Vector2()
+        self.prev_pos = pg.Vector2()
+        self.offset = pg.Vector2()
         self.shake_amount = 0
         self.shake_displacement = pg.Vector2()
 
@@ -67,6 +85,7 @@ class Camera:
         ww, wh = self.game.window.get_size()
         self.width = ww / self.scale.x
         self.height = wh / self.scale.x
+        self.prev_pos = self.pos.copy()
 
         # Move camera
         self.pos += self.vel * dt
@@ -97,8 +116,8 @@ class Camera:
         # Remove shake if too small
         if self.do_shake:
             self.shake_amount *= self.friction
-            self.shake_displacement.x = random.randint(-10,10) * self.shake_amount * dt
-            self.shake_displacement.y = random.randint(-10,10) * self.shake_amount * dt
+            self.shake_displacement.x = self.random.randint(-10,10) * self.shake_amount * dt
+            self.shake_displacement.y = self.random.randint(-10,10) * self.shake_amount * dt
             if self.shake_amount < 0.01:
                 self.shake_amount = 0
                 self.do_shake = False
@@ -107,4 +126,5 @@ class Camera:
 
         # Apply new displacement
         self.pos += self.shake_displacement
+        self.offset = pg.Vector2(int(self.pos.x), int(self.pos.y))
 
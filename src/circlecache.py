@@ -0,0 +1,44 @@
+"""
+-------------------------------------------------
+    Project: Sneaktime
+    Standard: 91906 (AS3.7)
+    School: Tauranga Boys' College
+    Author: Michael Ren
+    Date: 05 OCT 2021
+    Python: 3.9.6
+    License: MIT
+-------------------------------------------------
+"""
+
+import pygame as pg
+
+# Filled circles drawn once per color and whole pixel radius, so lots of them can
+# be blitted in one batch instead of being rasterized one by one
+class CircleCache:
+    def __init__(self):
+        self.sprites = {}
+
+    def get(self, color, radius):
+        key = (tuple(color), radius)
+        sprite = self.sprites.get(key)
+        if sprite is None:
+            size = radius * 2 + 1
+            sprite = pg.Surface((size, size))
+            # Any color that isn't the circle's works as the transparent color
+            key_color = (0, 0, 0) if tuple(color) != (0, 0, 0) else (255, 255, 255)
+            sprite.fill(key_color)
+            sprite.set_colorkey(key_color, pg.RLEACCEL)
+            pg.draw.circle(sprite, color, (radius, radius), radius)
+            self.sprites[key] = sprite
+        return sprite
+
+    # Same pixels as pg.draw.circle(screen, color, pos, radius), which truncates
+    # the position and radius to whole pixels
+    def blit_args(self, color, pos, radius):
+        r = int(radius)
+        if r < 1:
+            return None
+        return self.get(color, r), (int(pos[0]) - r, int(pos[1]) - r)
+
+
+cache = CircleCache()
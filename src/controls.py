@@ -0,0 +1,56 @@
+"""
+-------------------------------------------------
+    Project: Sneaktime
+    Standard: 91906 (AS3.7)
+    School: Tauranga Boys' College
+    Author: Michael Ren
+    Date: 05 OCT 2021
+    Python: 3.9.6
+    License: MIT
+-------------------------------------------------
+"""
+
+import pygame as pg
+
+# Where the game reads the pressed keys from, the player, tutorial and ui screens
+# all go through game.input so the keyboard can be swapped for something else
+
+# The real keyboard
+class KeyboardInput:
+    def get_pressed(self):
+        return pg.key.get_pressed()
+
+
+# Keys pressed by code instead of a person, used when running headless
+class ScriptedInput:
+    def __init__(self):
+        self.pressed = set()
+
+    def press(self, *keys):
+        self.pressed.update(keys)
+
+    def release(self, *keys):
+        self.pressed.difference_update(keys)
+
+    def set_pressed(self, keys):
+        self.pressed = set(keys)
+
+    def get_pressed(self):
+        return PressedKeys(self.pressed)
+
+
+# Keys held on each frame of a scripted run, walk around in a loop and shoot now and then
+def get_script_keys(frame):
+    keys = [[pg.K_RIGHT], [pg.K_DOWN], [pg.K_LEFT, pg.K_UP], [pg.K_RIGHT, pg.K_DOWN]][(frame // 90) % 4]
+    if frame % 50 < 3:
+        keys = keys + [pg.K_SPACE]
+    return keys
+
+
+# Looks like the result of pg.key.get_pressed(), keys[pg.K_SPACE] is True or False
+class PressedKeys:
+    def __init__(self, pressed):
+        self.pressed = frozenset(pressed)
+
+    def __getitem__(self, key):
+        return key in self.pressed
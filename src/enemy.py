@@ -11,46 +11,246 @@
 -------------------------------------------------
 """
 
-import random
+import numpy as np
 import pygame as pg
 import inventory
 import bullet
+import visibility
+import rng
 from collision import *
 from settings import *
 from scripts import *
 
+# Enemies draw their random numbers from their own stream
+enemy_random = rng.get("enemy")
+
+MAX_VEL = 300 # Fastest an enemy can move along each axis
+
 class EnemyManager:
     def __init__(self, game):
         self.game = game
         self.detect_outside_FOV = False
         self.entities = []
-        self.transparent_surface = pg.Surface(WORLD_SIZE, pg.SRCALPHA)
+        self.store = EnemyStore(game)
+        self.flow_field = None
 
     def add(self, e):
         self.entities.append(e)
 
     def update(self, dt):
+        # One shared path towards the player for every chasing enemy
+        if self.flow_field:
+            self.flow_field.update(self.game.player.c_pos)
+        # Normal enemies are all updated together, the boss updates itself
+        self.store.update(dt, self.detect_outside_FOV)
         for i, e in reversed(list(enumerate(self.entities))):
-            e.update(dt, self.detect_outside_FOV)
+            if not isinstance(e, Enemy):
+                e.update(dt, self.detect_outside_FOV)
             if e.is_dead():
                 sound_effects["splatter"].play()
                 self.game.player.kill_count += 1
+                self.game.spatial_hash.remove(e)
                 del self.entities[i]
+        self.store.remove_dead()
 
     def reset(self):
         self.detect_outside_FOV = False
         self.entities = []
+        self.store.reset()
+        self.game.spatial_hash.clear()
+        self.flow_field = self.game.level_manager.current_map().flow_field
+        self.game.overlay.clear("fov")
 
     def draw(self, screen):
-        # Draw transparent surface
-        screen.blit(self.transparent_surface, (0,0))
-        self.transparent_surface.fill((0, 0, 0, 0))
+        # Draw field of view areas
+        self.game.overlay.flush("fov", screen)
 
         # Draw enemies
         for e in self.entities:
             e.draw(screen)
 
 
+# The numbers that change every frame for every normal enemy, stored as columns of
+# preallocated arrays like the particles. Friction, turning, timers and velocity
+# limits are whole array operations, only enemies that can see the player go through
+# the per enemy logic (line of sight, shooting and path finding) in Python.
+class EnemyStore:
+    def __init__(self, game, capacity=32):
+        self.game = game
+        self.rng = rng.get_numpy("enemy")
+        self.friction = 0.9
+        self.views = []
+        self.count = 0
+        self.allocate(capacity)
+
+    def allocate(self, capacity):
+        self.capacity = capacity
+        self.pos = np.zeros((capacity, 2))
+        self.prev_pos = np.zeros((capacity, 2)) # Position before the last update, for drawing in between
+        self.vel = np.zeros((capacity, 2))
+        self.size = np.zeros((capacity, 2))
+        self.max_vel = np.zeros(capacity)
+        self.angle = np.zeros(capacity)
+        self.fov_angle = np.zeros(capacity)
+        self.angular_vel = np.zeros(capacity)
+        self.turn_delay_timer = np.zeros(capacity)
+        self.shoot_counter = np.zeros(capacity)
+        self.trigger_lockdown_timer = np.zeros(capacity)
+        self.can_shoot = np.zeros(capacity, bool)
+        self.alive = np.zeros(capacity, bool)
+
+    def get_columns(self):
+        return (self.pos, self.prev_pos, self.vel, self.size, self.max_vel, self.angle, self.fov_angle, self.angular_vel,
+                self.turn_delay_timer, self.shoot_counter, self.trigger_lockdown_timer, self.can_shoot, self.alive)
+
+    def grow(self):
+        old = self.get_columns()
+        self.allocate(self.capacity * 2)
+        n = self.count
+        for new, a in zip(self.get_columns(), old):
+            new[:n] = a[:n]
+
+    # Returns the row the enemy's numbers are stored in
+    def add(self, view, x, y, w, h, max_vel, turn_delay):
+        if self.count == self.capacity:
+            self.grow()
+        i = self.count
+        for a in self.get_columns():
+            a[i] = 0
+        self.pos[i] = (x, y)
+        self.prev_pos[i] = (x, y)
+        self.size[i] = (w, h)
+        self.max_vel[i] = max_vel
+        self.turn_delay_timer[i] = turn_delay
+        self.trigger_lockdown_timer[i] = 5
+        self.alive[i] = True
+        self.views.append(view)
+        self.count += 1
+        return i
+
+    def center(self, i):
+        return self.pos[i] + self.size[i] / 2
+
+    # Move the living enemies to the front of the arrays, keeping their order
+    def remove_dead(self):
+        n = self.count
+        alive = np.flatnonzero(self.alive[:n])
+        if len(alive) < n:
+            for a in self.get_columns():
+                a[:len(alive)] = a[alive]
+            self.views = [self.views[i] for i in alive.tolist()]
+            for i, view in enumerate(self.views):
+                view.i = i
+            self.count = len(alive)
+
+    def reset(self):
+        self.views = []
+        self.count = 0
+
+    def update(self, dt, detect_outside_FOV):
+        n = self.count
+        if not n:
+            return
+        game = self.game
+        game_map = game.level_manager.current_map()
+        player = game.player
+        views = self.views
+        pos = self.pos[:n]
+        vel = self.vel[:n]
+        angular_vel = self.angular_vel[:n]
+        turn_delay_timer = self.turn_delay_timer[:n]
+        self.prev_pos[:n] = pos
+        dv = np.array(player.c_pos) - (pos + self.size[:n] / 2)
+
+        # Find the enemies that can see the player, the exact test against the field of view
+        # is only done for enemies close enough for the player to be inside it
+        detected = np.zeros(n, bool)
+        if not player.inventory.has_powerup("disguise"):
+            if detect_outside_FOV:
+                detected[:] = True
+            else:
+                radius = player.collision_obj.radius
+                close = (dv ** 2).sum(axis=1) <= (np.hypot(self.size[:n, 0] * 2, self.size[:n, 1] * 5) + radius) ** 2
+                for i in np.flatnonzero(close).tolist():
+                    e = views[i]
+                    if visibility.circle_overlaps(e.FOV_polygon, *player.c_pos, radius) or (abs(dv[i, 0]) < e.img_w and abs(dv[i, 1]) < e.img_h):
+                        detected[i] = True
+
+        chasing = np.flatnonzero(detected)
+        if len(chasing):
+            if not game.level_manager.lockdown:
+                # Initiate lockdown after a few seconds delay
+                self.trigger_lockdown_timer[chasing] -= dt
+                expired = chasing[self.trigger_lockdown_timer[chasing] < 0]
+                if len(expired):
+                    game.level_manager.lockdown = True
+                    self.trigger_lockdown_timer[expired] = 5
+
+            # Turn towards the player
+            # https://stackoverflow.com/questions/42258637/how-to-know-the-angle-between-two-vectors
+            angle = np.arctan2(-dv[chasing, 1], -dv[chasing, 0])
+            self.angle[chasing] = angle + math.radians(180)
+            # Find the difference between two angles with sign
+            # https://stackoverflow.com/questions/1878907/how-can-i-find-the-difference-between-two-angles
+            a_diff = angle + math.radians(90) - self.fov_angle[chasing]
+            angular_vel[chasing] += np.arctan2(np.sin(a_diff), np.cos(a_diff))
+
+            # Shooting and steering need line of sight checks
+            for i in chasing.tolist():
+                views[i].chase(dv[i])
+
+            # Update shoot counter after shooting so the enemy doesn't immediately shoot when it detects the player
+            waiting = chasing[~self.can_shoot[chasing]]
+            self.shoot_counter[waiting] += dt
+            ready = waiting[self.shoot_counter[waiting] > 1]
+            self.can_shoot[ready] = True
+            self.shoot_counter[ready] = 0
+
+            max_vel = self.max_vel[:n, None]
+            np.clip(vel, -max_vel, max_vel, out=vel)
+
+        # Turn the enemies randomly when not chasing the player (in idle mode)
+        idle = ~detected
+        turn_delay_timer[idle] -= dt
+        turning = np.flatnonzero(idle & (np.abs(angular_vel) < 2) & (turn_delay_timer < 0))
+        if len(turning):
+            turn_delay_timer[turning] = self.rng.uniform(0.5, 2, len(turning))
+            angular_vel[turning] += self.rng.uniform(-12, 12, len(turning)) # Doesn't have to be in radians
+
+        pos += vel * dt
+        for e in views:
+            e.update_collision_obj()
+
+        # Enemies push themselves away from each other, then out of the walls, only the
+        # ones touching a wall need the exact push
+        collided = np.zeros(n, bool)
+        for i, e in enumerate(views):
+            for c in e.peer_collide():
+                pos[i] -= (c.x, c.y)
+                e.update_collision_obj()
+                collided[i] = True
+        c_pos = pos + self.size[:n] / 2
+        touching = game_map.get_distances(c_pos[:, 0], c_pos[:, 1]) < self.size[:n, 0] / 2
+        for i in np.flatnonzero(touching).tolist():
+            e = views[i]
+            for c in game_map.circle_collide(e.collision_obj):
+                pos[i] -= (c.x, c.y)
+                e.update_collision_obj()
+                collided[i] = True
+        vel[collided] = 0
+
+        # Turn enemies
+        self.fov_angle[:n] += angular_vel * dt
+
+        # Decrease velocity, and set it to 0 if too small
+        vel *= self.friction
+        angular_vel *= self.friction
+        vel[np.abs(vel) < 0.05] = 0
+
+        for e in views:
+            e.update_FOV()
+
+
 # Used as a signal so player can only complete the level after killing the boss
 class BossDeathComfirmation:
     def __init__(self):
@@ -61,10 +261,10 @@ class Boss:
     def __init__(self, game, x, y):
         self.game = game
         self.health = 10
-        self.shoot_angle = random.randint(0, 360)
-        self.shoot_timer = random.uniform(0.5, 3)
+        self.shoot_angle = enemy_random.randint(0, 360)
+        self.shoot_timer = enemy_random.uniform(0.5, 3)
         self.explosion_counter = 0
-        self.explosion_timer = random.uniform(0.2, 1)
+        self.explosion_timer = enemy_random.uniform(0.2, 1)
 
         # Sprites & Animation
         self.load_sprite()
@@ -78,8 +278,8 @@ class Boss:
         self.defeated = False
 
     def load_sprite(self):
-        self.img = pg.image.load(self.game.get_themed_path("characters", "boss.png")).convert_alpha()
-        self.img_defeated = pg.image.load(self.game.get_themed_path("characters", "boss_defeated.png")).convert_alpha()
+        self.img = self.game.load_image("characters", "boss.png")
+        self.img_defeated = self.game.load_image("characters", "boss_defeated.png")
 
     def is_dead(self):
         pass
@@ -89,19 +289,19 @@ class Boss:
         if self.health > 0:
             # Shoot back immediately
             self.shoot()
-            self.shoot_timer = random.uniform(0.5, 3)
-            self.shoot_angle = random.randint(0, 360)
+            self.shoot_timer = enemy_random.uniform(0.5, 3)
+            self.shoot_angle = enemy_random.randint(0, 360)
 
     def shoot(self):
         for i in range(0, 360, 60):
-            self.game.particle_manager.add(bullet.Bullet(self.game, *self.c_pos, math.radians(i+self.shoot_angle), "enemy"))
+            self.game.projectile_manager.add(*self.c_pos, math.radians(i+self.shoot_angle), "enemy")
         
     def update(self, dt, _):
         if self.health <= 0:
             if self.explosion_counter < 9:
                 self.explosion_timer -= dt
                 if self.explosion_timer < 0:
-                    self.explosion_timer = self.explosion_timer = random.uniform(0.2, 1)
+                    self.explosion_timer = self.explosion_timer = enemy_random.uniform(0.2, 1)
                     self.explosion_counter += 1
                     self.game.particle_manager.generate(*self.c_pos, self.game.get_color("primary"), (20, 30))
                     self.game.particle_manager.generate(*self.c_pos, self.game.get_color("third"), (20, 30))
@@ -115,205 +315,151 @@ class Boss:
             self.shoot_timer -= dt
             if self.shoot_timer < 0 and collide(self.detection_obj, self.game.player.collision_obj):
                 self.shoot()
-                self.shoot_timer = random.uniform(0.5, 3)
-                self.shoot_angle = random.randint(0, 360)
+                self.shoot_timer = enemy_random.uniform(0.5, 3)
+                self.shoot_angle = enemy_random.randint(0, 360)
 
     def draw(self, screen):
         if self.defeated:
-            screen.blit(self.img_defeated, self.pos)
+            screen.blit(self.img_defeated, self.game.camera.apply(self.pos))
         else:
-            screen.blit(self.img, self.pos)
+            screen.blit(self.img, self.game.camera.apply(self.pos))
 
 
+# A normal enemy, its numbers are stored in the manager's EnemyStore and updated there.
+# Reading pos, vel and c_pos gives copies, so they have to be assigned as a whole.
 class Enemy:
     def __init__(self, game, x, y):
         self.game = game
-        self.pos = pg.Vector2(x, y)
-        self.vel = pg.Vector2()
-        self.max_vel = random.randint(200, 300)
-        self.friction = 0.9
         self.mode = "move"
-        self.alive = True
 
         # Length from the center
         self.aim_line_length = 50
-        self.can_shoot = False
-        self.shoot_counter = 0
-        self.angle = 0
 
         # Sprites & Animation
         self.load_sprite()
         self.img_w, self.img_h = self.img.get_size()
 
-        # Field of view
-        v = Vector
-        self.c_pos = center(*self.pos, self.img_w, self.img_h)
-        self.collision_obj = Circle(v(*self.c_pos), self.img_w/2)
-        self.angular_vel = 0
+        self.store = game.enemy_manager.store
+        self.i = self.store.add(self, x, y, self.img_w, self.img_h, enemy_random.randint(200, MAX_VEL), enemy_random.uniform(0.5, 2)) # How long between each random turn in idle mode
+
+        # Field of view, relative to the center before it is turned
+        self.collision_obj = Circle(Vector(*self.c_pos), self.img_w/2)
         self.FOV_points = [
-            v(-self.img_w/2, 0),
-            v(self.img_w/2, 0), 
-            v(self.img_w*2, self.img_h*5), 
-            v(-self.img_w*2, self.img_h*5), 
+            (-self.img_w/2, 0),
+            (self.img_w/2, 0),
+            (self.img_w*2, self.img_h*5),
+            (-self.img_w*2, self.img_h*5),
         ]
-        self.FOV_obj = Poly(v(*self.c_pos), self.FOV_points, self.angle)
-        # How long between each random turn in idle mode
-        self.turn_delay_timer = random.uniform(0.5,2)
+        self.visibility = visibility.VisibilityCache()
+        self.update_FOV()
+
+    @property
+    def pos(self):
+        return pg.Vector2(*self.store.pos[self.i])
 
-        self.trigger_lockdown_timer = 5
+    @pos.setter
+    def pos(self, value):
+        self.store.pos[self.i] = value
+        self.update_collision_obj()
+
+    @property
+    def c_pos(self):
+        return pg.Vector2(*self.store.center(self.i))
+
+    @property
+    def vel(self):
+        return pg.Vector2(*self.store.vel[self.i])
+
+    @vel.setter
+    def vel(self, value):
+        self.store.vel[self.i] = value
+
+    @property
+    def max_vel(self):
+        return self.store.max_vel[self.i]
+
+    @property
+    def angle(self):
+        return self.store.angle[self.i]
+
+    @property
+    def alive(self):
+        return self.store.alive[self.i]
 
     def load_sprite(self):
-        self.img = pg.image.load(self.game.get_themed_path("characters", "enemy.png")).convert_alpha()
+        self.img = self.game.load_image("characters", "enemy.png")
 
     def is_dead(self):
         return not self.alive
 
-    def on_collision_with_bullet(self, i):
-        self.alive = False
-
-    def move(self, dt):
-        dx = self.vel.x * dt
-        dy = self.vel.y * dt
+    def update_collision_obj(self):
+        self.collision_obj.pos = Vector(*self.store.center(self.i))
 
-        self.pos.x += dx
-        self.pos.y += dy
+    # Clip the field of view against the walls, so enemies can't see through them
+    def update_FOV(self):
+        angle = self.store.fov_angle[self.i]
+        cos = math.cos(angle)
+        sin = math.sin(angle)
+        cx, cy = self.store.center(self.i).tolist()
+        points = [(cx + x*cos - y*sin, cy + x*sin + y*cos) for x, y in self.FOV_points]
+        self.FOV_polygon = self.visibility.update(self.game.level_manager.current_map(), (cx, cy), angle, points)
 
-        # Update collision object
-        self.c_pos = center(*self.pos, self.img_w, self.img_h)
-        self.collision_obj.pos = Vector(*self.c_pos)
-
-        all_collisions = self.peer_collide() + self.game.level_manager.current_map().poly_collide( self.collision_obj, capture_all=True)
-        if all_collisions:
-            for c in all_collisions:
-                self.pos.x -= c.x
-                self.pos.y -= c.y
-                self.c_pos = center(*self.pos, self.img_w, self.img_h)
-                self.collision_obj.pos = Vector(*self.c_pos)
-                # pass
-            self.vel.x = 0
-            self.vel.y = 0
-
-        # Turn enemy
-        self.FOV_obj.angle += self.angular_vel * dt
-
-        # Decrease velocity
-        self.vel.x *= self.friction
-        self.vel.y *= self.friction
-        self.angular_vel *= self.friction
-
-        # Set velocity to 0 if too small
-        if abs(self.vel.x) < 0.05:
-            self.vel.x = 0
-        if abs(self.vel.y) < 0.05:
-            self.vel.y = 0
+    def on_collision_with_bullet(self, i):
+        self.store.alive[self.i] = False
 
     def shoot(self):
-        if self.can_shoot:
-            self.game.particle_manager.add(bullet.Bullet(self.game, *self.c_pos, self.angle, "enemy"))
+        store = self.store
+        if store.can_shoot[self.i]:
+            self.game.projectile_manager.add(*self.c_pos, self.angle, "enemy")
             # Set kickback velocity (opposite to the bullet's velocity)
-            self.vel.x -= math.cos(self.angle) * self.max_vel
-            self.vel.y -= math.sin(self.angle) * self.max_vel
-            self.can_shoot = False
+            store.vel[self.i] -= (math.cos(self.angle) * self.max_vel, math.sin(self.angle) * self.max_vel)
+            store.can_shoot[self.i] = False
 
-    def simulate_controls(self, dt, detect_outside_FOV):
+    # The per enemy part of chasing the player, dv is the vector to the player
+    def chase(self, dv):
         player = self.game.player
-        dv = player.c_pos - self.c_pos
+        game_map = self.game.level_manager.current_map()
+        c_pos = self.c_pos
 
-        detected_player = False
-        
-        if not player.inventory.has_powerup("disguise"):
-            if detect_outside_FOV or (collide(self.game.player.collision_obj, self.FOV_obj) or (abs(dv.x) < self.img_w and abs(dv.y) < self.img_h)):
-                detected_player = True
-                
-                if not self.game.level_manager.lockdown:
-                    # Initiate lockdown after a few seconds delay
-                    self.trigger_lockdown_timer -= dt
-                    if self.trigger_lockdown_timer < 0:
-                        self.game.level_manager.lockdown = True
-                        self.trigger_lockdown_timer = 5
-
-                # Set angular velocity
-                # https://stackoverflow.com/questions/42258637/how-to-know-the-angle-between-two-vectors
-                angle = math.atan2(self.c_pos.y-player.c_pos.y, self.c_pos.x-player.c_pos.x)
-                rotated_angle = angle + math.radians(90)
-                self.angle = angle + math.radians(180)
-                a_diff = rotated_angle - self.FOV_obj.angle
-
-                # Find the difference between two angles with sign
-                # https://stackoverflow.com/questions/1878907/how-can-i-find-the-difference-between-two-angles
-                da = math.atan2(math.sin(a_diff), math.cos(a_diff))
-                self.angular_vel += da
-
-                # Shoot
-                # Only shoot if player is in direct line of sight
-                v = Vector
-
-                # Calculate how far the player is from the enemy
-                l_diff = abs((v(*player.c_pos) - v(*self.c_pos)).ln())
-
-                # Check for of the the player in the enemy's direct Line Of Sight
-                LOS_poly_points = [
-                    v(-bullet.Bullet.radius, 0),
-                    v(bullet.Bullet.radius, 0),
-                    v(bullet.Bullet.radius, l_diff),
-                    v(-bullet.Bullet.radius, l_diff),
-                ]
-                LOS_poly = Poly(v(*self.c_pos), LOS_poly_points, rotated_angle)
-                collision = self.game.level_manager.current_map().poly_collide(LOS_poly)
-                # Shoot if there's not obstables in the way
-                if not collision:
-                    self.shoot()
-
-                # Debug, draw aiming line
-                # pg.draw.polygon(screen, (100,100,100, 32), LOS_poly.points)
-
-                # Update shoot counter here so the enemy doesn't immediately shoot when it detects the player
-                if not self.can_shoot:
-                    self.shoot_counter += dt
-                    if self.shoot_counter > 1:
-                        self.can_shoot = True
-                        self.shoot_counter = 0
-
-                # Move the enemy
-                self.vel = dv
-                if self.vel.x > self.max_vel:
-                    self.vel.x = self.max_vel
-                elif self.vel.x < -self.max_vel:
-                    self.vel.x = -self.max_vel
-                if self.vel.y > self.max_vel:
-                    self.vel.y = self.max_vel
-                elif self.vel.y < -self.max_vel:
-                    self.vel.y = -self.max_vel
-
-        if not detected_player:
-            # Turn the enemy randomly when not chasing the player (in idle mode)
-            self.turn_delay_timer -= dt
-            if abs(self.angular_vel) < 2 and self.turn_delay_timer < 0:
-                self.turn_delay_timer = random.uniform(0.5, 2)
-                self.angular_vel += random.uniform(-12,12) # Doesn't have to be in radians
+        # Shoot
+        # Only shoot if player is in direct line of sight,
+        # the line is as wide as a bullet so it won't be shot into a wall
+        if game_map.line_of_sight(c_pos, player.c_pos, bullet.RADIUS):
+            self.shoot()
+
+        # Move the enemy, straight at the player if nothing is in the way,
+        # otherwise follow the flow field around the walls
+        self.vel = dv
+        if not game_map.line_of_sight(c_pos, player.c_pos, self.collision_obj.radius):
+            direction = self.game.enemy_manager.flow_field.sample(c_pos)
+            if direction:
+                self.vel = pg.Vector2(direction) * self.max_vel
 
     def peer_collide(self):
         all_collisions = []
-        for e in self.game.enemy_manager.entities:
-            if e != self:
+        a = self.collision_obj
+        for e in self.game.spatial_hash.nearby(a):
+            b = e.collision_obj
+            # Cheap distance check first, most nearby enemies aren't touching
+            if e != self and (a.pos.x - b.pos.x) ** 2 + (a.pos.y - b.pos.y) ** 2 <= (a.radius + b.radius) ** 2:
                 r = Response()
                 if collide(self.collision_obj, e.collision_obj, r):
                     all_collisions.append(r.overlap_v)
         return all_collisions
 
-    def update(self, dt, detect_outside_FOV):
-        self.simulate_controls(dt, detect_outside_FOV)
-        self.move(dt)
-        self.FOV_obj.pos = Vector(*self.c_pos)
-
     def draw(self, screen):
+        pos = self.game.lerp(self.store.prev_pos[self.i], self.store.pos[self.i])
+        c_pos = center(*pos, self.img_w, self.img_h)
+
         if self.mode == "aim":
             # Draw aiming lines
-            end_pos = pg.Vector2(self.c_pos.x + math.cos(self.angle)*self.aim_line_length, self.c_pos.y + math.sin(self.angle)*self.aim_line_length)
-            pg.draw.circle(screen, self.game.get_color("primary"), end_pos, 5)
+            end_pos = pg.Vector2(c_pos.x + math.cos(self.angle)*self.aim_line_length, c_pos.y + math.sin(self.angle)*self.aim_line_length)
+            pg.draw.circle(screen, self.game.get_color("primary"), self.game.camera.apply(end_pos), 5)
 
-        # Draw FOV area
-        pg.draw.polygon(self.game.enemy_manager.transparent_surface, (*self.game.get_color("background"), 32), self.FOV_obj.points)
+        # Draw FOV area, moved along with the enemy
+        if len(self.FOV_polygon) > 2:
+            dx, dy = pos - self.pos
+            self.game.overlay.polygon("fov", (*self.game.get_color("background"), 32), [(x + dx, y + dy) for x, y in self.FOV_polygon])
 
         # Draw self
-        screen.blit(self.img, self.pos)
\ No newline at end of file
+        screen.blit(self.img, self.game.camera.apply(pos))
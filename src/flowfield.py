@@ -0,0 +1,112 @@
+"""
+-------------------------------------------------
+    Project: Sneaktime
+    Standard: 91906 (AS3.7)
+    School: Tauranga Boys' College
+    Author: Michael Ren
+    Date: 05 OCT 2021
+    Python: 3.9.6
+    License: MIT
+-------------------------------------------------
+"""
+
+import math
+from collections import deque
+
+# Neighbour offsets, the direction stored for each cell is an index into this list
+# (0 means there is no direction), opposite directions are next to each other
+NEIGHBOURS = [
+    (0, 0),
+    (1, 0), (-1, 0), (0, 1), (0, -1),
+    (1, 1), (-1, -1), (1, -1), (-1, 1),
+]
+DIRECTIONS = [(dx / math.hypot(dx, dy), dy / math.hypot(dx, dy)) if dx or dy else (0, 0) for dx, dy in NEIGHBOURS]
+
+# Breadth first search outwards from the player over the walkable cells of the map,
+# every cell then points towards its neighbour that is one step closer to the player
+class FlowField:
+    def __init__(self, game_map, scale=2, budget=500):
+        # Each cell covers scale x scale cells of the map's occupancy grid
+        self.size = game_map.occupancy_size * scale
+        self.x = game_map.occupancy_x
+        self.y = game_map.occupancy_y
+        self.cols = math.ceil(game_map.occupancy_cols / scale)
+        self.rows = math.ceil(game_map.occupancy_rows / scale)
+        # Max number of cells visited per frame, a search can be spread over a few frames
+        self.budget = budget
+
+        # A cell is only walkable if none of the occupancy cells it covers are blocked
+        self.walkable = bytearray(self.cols * self.rows)
+        for row in range(self.rows):
+            for col in range(self.cols):
+                blocked = False
+                for r in range(row * scale, row * scale + scale):
+                    for c in range(col * scale, col * scale + scale):
+                        if game_map.is_blocked(c, r):
+                            blocked = True
+                self.walkable[row * self.cols + col] = not blocked
+
+        # The field in use, and the one being searched
+        self.field = bytearray(self.cols * self.rows)
+        self.target = None
+        self.search = None
+        self.ready = False
+
+    def get_cell(self, pos):
+        return math.floor((pos[0] - self.x) / self.size), math.floor((pos[1] - self.y) / self.size)
+
+    def update(self, target_pos):
+        cell = self.get_cell(target_pos)
+        if cell != self.target:
+            # Only start a new search when the target moves into another cell
+            self.target = cell
+            col, row = cell
+            if 0 <= col < self.cols and 0 <= row < self.rows:
+                visited = bytearray(self.cols * self.rows)
+                visited[row * self.cols + col] = 1
+                self.search = (bytearray(self.cols * self.rows), visited, deque([cell]))
+            else:
+                self.search = None
+                self.field = bytearray(self.cols * self.rows)
+            # The first field has to be complete straight away
+            if self.search and not self.ready:
+                self.step(math.inf)
+                return
+        if self.search:
+            self.step(self.budget)
+
+    def step(self, budget):
+        field, visited, frontier = self.search
+        cols = self.cols
+        rows = self.rows
+        walkable = self.walkable
+        while frontier and budget > 0:
+            budget -= 1
+            col, row = frontier.popleft()
+            for i in range(1, 9):
+                dx, dy = NEIGHBOURS[i]
+                c = col + dx
+                r = row + dy
+                if 0 <= c < cols and 0 <= r < rows:
+                    n = r * cols + c
+                    if not visited[n] and walkable[n]:
+                        # Don't cut corners diagonally
+                        if dx and dy and not (walkable[row * cols + c] and walkable[r * cols + col]):
+                            continue
+                        visited[n] = 1
+                        # Point back towards the cell it was reached from
+                        field[n] = i + 1 if i % 2 else i - 1
+                        frontier.append((c, r))
+        if not frontier:
+            self.field = field
+            self.search = None
+            self.ready = True
+
+    # Direction to move in to get closer to the target, None if the position isn't on the field
+    def sample(self, pos):
+        col, row = self.get_cell(pos)
+        if 0 <= col < self.cols and 0 <= row < self.rows:
+            i = self.field[row * self.cols + col]
+            if i:
+                return DIRECTIONS[i]
+        return None
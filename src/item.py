@@ -12,6 +12,7 @@
 """
 
 import pygame as pg
+import transformcache
 from collision import *
 from settings import *
 from scripts import *
@@ -65,6 +66,8 @@ class DisguisePowerUp:
 
         self.load_sprite()
         self.img_w, self.img_h = self.img.get_size()
+        # Items spin all the time
+        transformcache.cache.prewarm_rotations(self.img)
 
         v = Vector
         self.collision_obj = Poly(
@@ -73,7 +76,7 @@ class DisguisePowerUp:
         )
 
     def load_sprite(self):
-        self.img = pg.image.load(self.game.get_themed_path("powerups", "disguise.png")).convert_alpha()
+        self.img = self.game.load_image("powerups", "disguise.png")
 
     def is_expired(self):
         if self.timer < 0:
@@ -93,9 +96,9 @@ class DisguisePowerUp:
         gap = 20
         y = 20 + index*(self.img_h/2 + 10) # This assumes all images are the same height
         ww, wh = self.game.window.get_size()
-        scaled_img = pg.transform.scale(self.img, (int(self.img_w/2), int(self.img_h/2)))
+        scaled_img = transformcache.cache.scale(self.img, (self.img_w/2, self.img_h/2))
         iw, ih = scaled_img.get_size()
-        pos = pg.Vector2((ww - line_width - gap - iw) / 2, y) + self.game.camera.pos
+        pos = pg.Vector2((ww - line_width - gap - iw) / 2, y)
         screen.blit(scaled_img, pos)
         pos.x += iw + gap
         pos.y += ih/2
@@ -108,8 +111,8 @@ class DisguisePowerUp:
         )
 
     def draw(self, screen):
-        rotated_img = pg.transform.rotate(self.img, self.angle)
-        new_rect = rotated_img.get_rect(center=center(*self.pos, self.img_w, self.img_h))
+        rotated_img = transformcache.cache.rotate(self.img, self.angle)
+        new_rect = rotated_img.get_rect(center=center(*self.game.camera.apply(self.pos), self.img_w, self.img_h))
         screen.blit(rotated_img, new_rect)
 
 
@@ -125,7 +128,7 @@ class ShotgunPowerUp(DisguisePowerUp):
         )
 
     def load_sprite(self):
-        self.img = pg.image.load(self.game.get_themed_path("powerups", "shotgun.png")).convert_alpha()
+        self.img = self.game.load_image("powerups", "shotgun.png")
         
 
 class ArmourPowerUp(DisguisePowerUp):
@@ -140,7 +143,7 @@ class ArmourPowerUp(DisguisePowerUp):
         )
 
     def load_sprite(self):
-        self.img = pg.image.load(self.game.get_themed_path("powerups", "armour.png")).convert_alpha()
+        self.img = self.game.load_image("powerups", "armour.png")
 
     def draw(self, screen):
         super().draw(screen)
@@ -159,7 +162,7 @@ class KeyItem(DisguisePowerUp):
         )
 
     def load_sprite(self):
-        self.img = pg.image.load(self.game.get_themed_path("items", "key.png")).convert_alpha()
+        self.img = self.game.load_image("items", "key.png")
 
 
 
@@ -14,6 +14,7 @@
 import math
 import pygame as pg
 import tilemap
+import loader
 import enemy
 import item
 import trap
@@ -174,7 +175,7 @@ class LevelManager:
         self.levels = LEVELS
         self.tutorial_messages = TUTORIAL_MESSAGES
         self.level_stats = [{} for i in range(len(LEVELS))]
-        self.transparent_surface = pg.Surface(WORLD_SIZE, pg.SRCALPHA)
+        self.loader = None
 
     def record_stats(self):
         p = self.game.player
@@ -212,10 +213,19 @@ class LevelManager:
         if self.game.current_theme != level_obj["theme"]:
             self.game.current_theme = level_obj["theme"]
             self.game.player.load_sprite()
+        # Start building the map in the background while the level screen is showing
+        self.loader = loader.LevelLoader(self.game, level_obj)
         # Show level screen
         self.game.mode = "level"
         self.game.level_screen = ui.LevelScreen(self.game)
 
+    # Go straight into a level without the menus or the tutorial, used when nobody is at the keyboard
+    def start(self, n):
+        self.game.player.completed_tutorial = True
+        self.switch(n)
+        self.load_level()
+        self.game.mode = "main"
+
     def next(self):
         if self.current_level < len(self.levels) - 1:
             self.switch(self.current_level + 1)
@@ -230,13 +240,18 @@ class LevelManager:
 
         level_obj = self.current_level_obj()
 
-        # Load map
-        self.map = tilemap.TiledMap(self.game, level_obj["path"])
+        # Load map, use the one built in the background if there is one
+        if self.loader:
+            self.map = self.loader.get_map()
+            self.loader = None
+        else:
+            self.map = tilemap.TiledMap(self.game, level_obj["path"])
 
         # Reset variables and game components
         self.reset()
         self.game.player.reset()
         self.game.particle_manager.reset()
+        self.game.projectile_manager.reset()
         self.game.enemy_manager.reset()
         self.game.item_manager.reset()
         self.game.trap_manager.reset()
@@ -250,6 +265,7 @@ class LevelManager:
         # Set player position
         x, y, _, _ = spawners["player"][0]["rect"]
         self.game.player.pos = pg.Vector2(x, y)
+        self.game.player.prev_pos = pg.Vector2(x, y)
 
         img_size = (48, 48)
 
@@ -362,10 +378,8 @@ class LevelManager:
             opacity = 50 + math.sin(self.lockdown_opacity_counter * 4) * 50
             if opacity > 255: opacity = 255
             elif opacity < 0: opacity = 0
-            ww, wh = self.game.window.get_size()
-            pg.draw.rect(self.transparent_surface, (255, 0, 76, opacity), (self.game.camera.pos.x-20, self.game.camera.pos.y-20, ww+40, wh+40))
-        screen.blit(self.transparent_surface, (0, 0))
-        self.transparent_surface.fill((0, 0, 0, 0))
+            self.game.overlay.fill("lockdown", (255, 0, 76, opacity))
+        self.game.overlay.flush("lockdown", screen)
 
     def draw(self, screen):
         self.current_map().draw(screen)
@@ -0,0 +1,58 @@
+"""
+-------------------------------------------------
+    Project: Sneaktime
+    Standard: 91906 (AS3.7)
+    School: Tauranga Boys' College
+    Author: Michael Ren
+    Date: 05 OCT 2021
+    Python: 3.9.6
+    License: MIT
+-------------------------------------------------
+"""
+
+import threading
+import assets
+import tilemap
+from settings import *
+
+# Builds a level's map data on a worker thread while the level screen is showing,
+# headless runs, benchmarks and recordings build it straight away so every run takes the same steps.
+# The worker never touches pygame surfaces or the asset manager, the theme's sprites and the
+# map's chunk surfaces are made on the main thread when the map is handed over.
+class LevelLoader:
+    def __init__(self, game, level_obj, threaded=not (headless or run_bench or record_path or replay_path)):
+        self.game = game
+        self.level_obj = level_obj
+        self.progress = 0
+        self.map = None
+        self.error = None
+        self.thread = None
+        if threaded:
+            self.thread = threading.Thread(target=self.run, daemon=True)
+            self.thread.start()
+        else:
+            self.run()
+
+    def set_progress(self, progress):
+        self.progress = progress
+
+    def run(self):
+        try:
+            self.map = tilemap.TiledMap(self.game, self.level_obj["path"], self.set_progress, load_surfaces=False)
+        except Exception as e:
+            # Raised again on the main thread when the map is handed over
+            self.error = e
+        self.progress = 1
+
+    def is_done(self):
+        return not self.thread or not self.thread.is_alive()
+
+    def get_map(self):
+        if self.thread:
+            self.thread.join()
+        if self.error:
+            raise self.error
+        # Sprites are created when the level starts, have them ready by then
+        assets.manager.load_theme(self.level_obj["theme"])
+        self.map.load_surfaces()
+        return self.map
@@ -11,7 +11,7 @@
 -------------------------------------------------
 """
 
-import sys, json, math, random, os
+import sys, json, math, os, time
 import pygame as pg
 import camera
 import ui
@@ -19,40 +19,72 @@ import level
 import player
 import enemy
 import particle
+import bullet
 import item
 import trap
 import theme
 import tutorial
+import overlay
+import assets
+import spatialhash
+import controls
+import replay
+import bench
+import profiler
 from settings import *
 
 pg.init()
 pg.display.set_caption("sneaktime")
 
 class GameManager:
-    def __init__(self):
+    def __init__(self, input_source=None, replay_file=replay_path, record_file=record_path):
         self.window = pg.display.set_mode(WINDOW_SIZE, pg.RESIZABLE)
-        self.screen = pg.Surface(WORLD_SIZE)
+        self.screen = pg.Surface(WINDOW_SIZE)
         self.clock = pg.time.Clock()
         self.mode = "splash"
         self.target_speed = 1
         self.speed = 1
         self.speed_change_constant = 4
+        # Simulation time that hasn't been stepped yet, and how far between the last two steps to draw
+        self.accumulator = 0
+        self.alpha = 1
         self.current_theme = "purple"
+        self.assets = assets.manager
+        # Pressed keys come from here, a script can stand in for the keyboard
+        self.input = input_source or (controls.ScriptedInput() if headless else controls.KeyboardInput())
+
+        # Recording or playing back a run, this has to happen before anything uses random numbers
+        self.recorder = None
+        if replay_file:
+            self.recorder = replay.Replayer(self, replay_file)
+        elif record_file:
+            self.recorder = replay.Recorder(self, record_file, record_seed)
 
         # Game components
+        self.profiler = profiler.Profiler(self)
         self.camera = camera.Camera(self)
+        self.overlay = overlay.OverlayCompositor(self)
         self.splash_screen = ui.SplashScreen(self)
         self.level_manager = level.LevelManager(self)
         self.player = player.Player(self)
         self.enemy_manager = enemy.EnemyManager(self)
+        # Enemies can move at their top speed for the longest update between the hash being rebuilt
+        # and queried, plus a little for being pushed out of walls and each other
+        self.spatial_hash = spatialhash.SpatialHash(margin=math.hypot(enemy.MAX_VEL, enemy.MAX_VEL) * max_step + 32)
         self.particle_manager = particle.ParticleManager(self)
+        self.projectile_manager = bullet.ProjectileManager(self)
         self.item_manager = item.ItemManager(self)
         self.trap_manager = trap.TrapManager(self)
         self.interface_manager = ui.InterfaceManager(self)
         self.tutorial_manager = tutorial.TutorialManager(self)
 
-    def get_themed_path(self, folder, file):
-        return os.path.join(*[rs_dir, folder, self.current_theme, file])
+        # Replays of runs that skipped the menus start in the same level
+        if isinstance(self.recorder, replay.Replayer) and self.recorder.start_level is not None:
+            self.level_manager.start(self.recorder.start_level)
+
+    # Shared copy of a sprite for the current theme
+    def load_image(self, folder, file):
+        return self.assets.themed_image(self.current_theme, folder, file)
 
     def get_theme(self):
         return theme.THEMES[self.current_theme]
@@ -60,6 +92,10 @@ class GameManager:
     def get_color(self, key):
         return theme.THEMES[self.current_theme][key]
 
+    # Where to draw something that moved from prev to current in the last step
+    def lerp(self, prev, current):
+        return pg.Vector2(prev[0] + (current[0] - prev[0]) * self.alpha, prev[1] + (current[1] - prev[1]) * self.alpha)
+
     def change_speed(self, speed, const=None):
         self.target_speed = speed
         if const:
@@ -68,7 +104,21 @@ class GameManager:
     def has_save(self):
         return os.path.isfile(cache_path)
 
+    # Progress saved by a previous session, a replay uses the one its recording started from
+    def read_save(self):
+        if self.recorder:
+            return self.recorder.save_data
+        # Headless runs and benchmarks start from an empty save so they don't depend on this player's progress
+        if headless or run_bench:
+            return None
+        if self.has_save():
+            with open(cache_path, 'r') as f:
+                return json.load(f)
+
     def save(self):
+        # Headless runs, benchmarks and replays shouldn't change the player's progress
+        if headless or run_bench or (self.recorder and not self.recorder.writes_save):
+            return
         p = self.player
         data = {
             "current_level": self.level_manager.unlocked_level,
@@ -78,22 +128,27 @@ class GameManager:
             json.dump(data, f)
 
     def load(self):
-        if self.has_save():
-            with open(cache_path, 'r') as f:
-                d = json.load(f)
-                # Always resume from the "select" screen
-                self.mode = "select"
-                level = d["current_level"]
-                if level < len(self.level_manager.levels) - 1:
-                    level += 1
-                self.level_manager.current_level = level
-                self.level_manager.unlocked_level = level
-                self.level_manager.level_stats = d["level_stats"]
-                self.select_screen = ui.SelectScreen(self)
+        d = self.read_save()
+        if d:
+            # Always resume from the "select" screen
+            self.mode = "select"
+            level = d["current_level"]
+            if level < len(self.level_manager.levels) - 1:
+                level += 1
+            self.level_manager.current_level = level
+            self.level_manager.unlocked_level = level
+            self.level_manager.level_stats = d["level_stats"]
+            self.select_screen = ui.SelectScreen(self)
             self.interface_manager.message(f"You progress is resumed from the previous session", typing_effect=False)
             return True
             
     def update(self, dt):
+        # After a long stall the game slows down instead of moving everything a long way at once
+        dt = min(dt, max_step)
+        # Record the keys and dt of this update, or replace them with the recorded ones
+        if self.recorder:
+            dt = self.recorder.update(dt)
+
         ds = self.target_speed - self.speed # Delta speed
         self.speed += ds * self.speed_change_constant * dt # Increase the constant to increase the speed change
         if abs(ds) < 0.01:
@@ -109,17 +164,21 @@ class GameManager:
         elif self.mode == "level":
             self.level_screen.update(dt)
         elif self.mode == "main":
-            self.camera.update(dt)
-            self.level_manager.update(dt)
-            self.player.update(dt)
-            self.enemy_manager.update(dt)
-            self.particle_manager.update(dt)
-            self.item_manager.update(dt)
-            self.trap_manager.update(dt)
-            self.tutorial_manager.update(dt)
+            timed = self.profiler.timed
+            timed("update", "camera", self.camera.update)(dt)
+            timed("update", "level", self.level_manager.update)(dt)
+            # Enemy positions for this frame's peer, bullet and boss collisions
+            timed("update", "hash", self.spatial_hash.rebuild)(self.enemy_manager.entities)
+            timed("update", "player", self.player.update)(dt)
+            timed("update", "enemies", self.enemy_manager.update)(dt)
+            timed("update", "bullets", self.projectile_manager.update)(dt)
+            timed("update", "particles", self.particle_manager.update)(dt)
+            timed("update", "items", self.item_manager.update)(dt)
+            timed("update", "traps", self.trap_manager.update)(dt)
+            timed("update", "tutorial", self.tutorial_manager.update)(dt)
         elif self.mode == "complete":
             self.complete_screen.update(dt)
-        self.interface_manager.update(dt)
+        self.profiler.timed("update", "interface", self.interface_manager.update)(dt)
 
     def draw(self):
         if self.mode == "splash":
@@ -131,66 +190,112 @@ class GameManager:
         elif self.mode == "level":
             self.level_screen.draw(self.screen)
         elif self.mode == "main":
-            self.level_manager.draw(self.screen)
-            self.item_manager.draw(self.screen)
-            self.player.draw(self.screen)
-            self.enemy_manager.draw(self.screen)
-            self.particle_manager.draw(self.screen)
-            self.trap_manager.draw(self.screen)
-            self.tutorial_manager.draw(self.screen)
+            timed = self.profiler.timed
+            timed("draw", "level", self.level_manager.draw)(self.screen)
+            timed("draw", "items", self.item_manager.draw)(self.screen)
+            timed("draw", "player", self.player.draw)(self.screen)
+            timed("draw", "enemies", self.enemy_manager.draw)(self.screen)
+            timed("draw", "particles", self.particle_manager.draw)(self.screen)
+            timed("draw", "bullets", self.projectile_manager.draw)(self.screen)
+            timed("draw", "traps", self.trap_manager.draw)(self.screen)
+            timed("draw", "tutorial", self.tutorial_manager.draw)(self.screen)
 
             # Top layers
-            self.level_manager.draw_filter(self.screen)
-            self.player.inventory.draw(self.screen)
+            timed("draw", "level", self.level_manager.draw_filter)(self.screen)
+            timed("draw", "inventory", self.player.inventory.draw)(self.screen)
         elif self.mode == "complete":
             self.complete_screen.draw(self.screen)
-        self.interface_manager.draw(self.screen)
+        self.profiler.timed("draw", "interface", self.interface_manager.draw)(self.screen)
+
+    def render(self):
+        # Everything is drawn relative to the camera onto a surface the size of the view,
+        # so the cost of filling and scaling it doesn't depend on the size of the world
+        ww, wh = self.window.get_size()
+        size = (math.ceil(ww / self.camera.scale.x), math.ceil(wh / self.camera.scale.y))
+        if self.screen.get_size() != size:
+            self.screen = pg.Surface(size)
+
+        self.screen.fill(self.get_color("background"))
+        self.camera.interpolate()
+        self.draw()
+        self.profiler.timed("draw", "profiler", self.profiler.draw)(self.screen)
+        if self.camera.scale == (1, 1):
+            self.window.blit(self.screen, (0, 0))
+        else:
+            self.window.blit(pg.transform.scale(self.screen, (ww, wh)), (0, 0))
 
     def event_loop(self):
         while 1:
             for event in pg.event.get():
                 if event.type == pg.QUIT:
                     sys.exit()
+                elif event.type == pg.KEYDOWN and event.key == pg.K_F3:
+                    self.profiler.toggle()
                 elif event.type == pg.VIDEORESIZE:
                     w, h = event.size
                     w = 640 if w < 640 else w
                     h = 480 if h < 480 else h
                     self.window = pg.display.set_mode((w, h), pg.RESIZABLE)
             
-            dt = self.clock.tick(60) / 1000
+            dt = self.clock.tick(max_fps) / 1000
+            self.profiler.start_frame()
             # fps debug
-            # fps = round(1000/dt)
+            # fps = round(1/dt)
             # if fps < 40:
             #     print(fps, "fps (Low)")
-            # dt /= 1000
 
-            self.update(dt)
+            if fixed_timestep:
+                # Run as many fixed steps as fit in the time that has passed, carrying the rest over
+                step = 1 / tick_rate
+                self.accumulator = min(self.accumulator + dt, step * max_catch_up_steps)
+                while self.accumulator >= step:
+                    self.update(step)
+                    self.accumulator -= step
+                self.alpha = self.accumulator / step
+            else:
+                self.update(dt)
 
-            self.screen.fill(self.get_color("background"))
-            self.draw()
-            self.window.fill(self.get_color("background"))
-            # Render main surface after scaling it by the scale factor
-            sw, sh = self.screen.get_size()
-            self.window.blit(
-                pg.transform.scale(
-                    self.screen,
-                    (
-                        int(sw*self.camera.scale.x),
-                        int(sh*self.camera.scale.y)
-                    )
-                ), (0, 0), 
-                (
-                    self.camera.pos.x * self.camera.scale.x,
-                    self.camera.pos.y * self.camera.scale.y,
-                    self.window.get_width(), self.window.get_height()
-                )
-            )
+            self.render()
             pg.display.flip()
+            self.profiler.end_frame()
+
+    # Step the game as fast as possible without drawing anything, every frame is
+    # one simulation step long no matter how long it really took.
+    # script(frame) gives the keys to hold on each frame, e.g. controls.get_script_keys
+    def simulate(self, frames, dt=None, script=None):
+        dt = dt or 1 / tick_rate
+        for frame in range(frames):
+            pg.event.pump()
+            if script:
+                # While recording, the recorder passes the keys on to the game
+                (self.recorder.source if self.recorder else self.input).set_pressed(script(frame))
+            self.update(dt)
 
 
 try:
+    if run_bench:
+        bench.run(lambda input_source, replay_file: GameManager(input_source, replay_file, None), headless_frames, bench_path)
+        sys.exit()
+
     game = GameManager()
-    game.event_loop()
+    if headless:
+        if replay_path:
+            # A replay runs for as long as its recording and brings its own keys
+            frames = len(game.recorder.frames)
+            script = None
+        else:
+            # Nobody is at the keyboard, start the level from "--level" and walk around it
+            frames = headless_frames
+            script = controls.get_script_keys
+            game.level_manager.start(headless_level)
+            if game.recorder:
+                game.recorder.start_level = headless_level
+        start = time.perf_counter()
+        game.simulate(frames, script=script)
+        elapsed = time.perf_counter() - start
+        print(f"Simulated {frames} frames in {elapsed:.2f}s ({frames / elapsed:.0f} frames per second)")
+    else:
+        game.event_loop()
 except KeyboardInterrupt:
     print("ctrl-c Keyboard Interrupt")
 
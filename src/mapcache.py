@@ -0,0 +1,303 @@
+"""
+-------------------------------------------------
+    Project: Sneaktime
+    Standard: 91906 (AS3.7)
+    School: Tauranga Boys' College
+    Author: Michael Ren
+    Date: 05 OCT 2021
+    Python: 3.9.6
+    License: MIT
+-------------------------------------------------
+"""
+
+import os, sys, json, struct, hashlib, mmap, zlib
+from array import array
+from settings import *
+
+# Compiled copies of the Tiled JSON maps. The layout mirrors the JSON (a list of
+# layers in map order) but tile ids and polygon vertices are stored as typed arrays
+# and the spawner and tracker tables are resolved at compile time.
+#
+# Usage:
+#     python mapcache.py -d    (compile every map in the resources folder)
+
+MAGIC = b"STMAP"
+VERSION = 1
+
+TILE_LAYER = 0
+OBJECT_LAYER = 1
+
+# magic, version, source mtime (ns), source size, source sha1, tables crc
+HEADER = struct.Struct("<5sHqq20sI")
+
+# Maps that have already been read during this session, keyed by source path
+loaded = {}
+
+def get_cache_path(path):
+    name = os.path.splitext(os.path.basename(path))[0]
+    return os.path.join(map_cache_dir, name + ".bin")
+
+# The spawner and tracker tables are baked into the cache, so a change to them must invalidate it
+def tables_key(spawner_tiles, tracker_tiles):
+    return zlib.crc32(repr((sorted(spawner_tiles.items()), sorted(tracker_tiles.items()))).encode())
+
+def to_le(a):
+    if sys.byteorder != "little":
+        a = array(a.typecode, a)
+        a.byteswap()
+    return a
+
+def from_le(a):
+    if sys.byteorder != "little":
+        a.byteswap()
+    return a
+
+
+class Writer:
+    def __init__(self):
+        self.parts = []
+
+    def pack(self, fmt, *values):
+        self.parts.append(struct.pack("<" + fmt, *values))
+
+    def string(self, s):
+        b = s.encode("utf-8")
+        self.pack("H", len(b))
+        self.parts.append(b)
+
+    def array(self, a):
+        self.pack("I", len(a))
+        self.parts.append(to_le(a).tobytes())
+
+    def getvalue(self):
+        return b"".join(self.parts)
+
+
+class Reader:
+    def __init__(self, buffer, offset=0):
+        self.buffer = buffer
+        self.offset = offset
+
+    def unpack(self, fmt):
+        s = struct.Struct("<" + fmt)
+        values = s.unpack_from(self.buffer, self.offset)
+        self.offset += s.size
+        return values
+
+    def string(self):
+        n, = self.unpack("H")
+        s = bytes(self.buffer[self.offset:self.offset+n]).decode("utf-8")
+        self.offset += n
+        return s
+
+    def array(self, typecode):
+        n, = self.unpack("I")
+        a = array(typecode)
+        size = n * a.itemsize
+        a.frombytes(self.buffer[self.offset:self.offset+size])
+        self.offset += size
+        return from_le(a)
+
+
+def compile_map(data, spawner_tiles, tracker_tiles):
+    w = Writer()
+    tilewidth = data["tilewidth"]
+    tileheight = data["tileheight"]
+    w.pack("II", tilewidth, tileheight)
+
+    spawners = {}
+    trackers = {}
+    for k in spawner_tiles:
+        spawners[k] = []
+    for k in tracker_tiles:
+        trackers[k] = []
+
+    w.pack("I", len(data["layers"]))
+    for layer in data["layers"]:
+        if layer["type"] == "tilelayer":
+            w.pack("B", TILE_LAYER)
+            w.string(layer["name"])
+            w.pack("BI", layer["visible"], len(layer["chunks"]))
+            for chunk in layer["chunks"]:
+                cw = chunk["width"]
+                cx = chunk["x"]
+                cy = chunk["y"]
+                w.pack("iiII", cx, cy, cw, chunk["height"])
+                w.array(array("I", chunk["data"]))
+                # Spawner tile and camera tracker layers must be hidden
+                if not layer["visible"]:
+                    for i, tile_id in enumerate(chunk["data"]):
+                        if tile_id == 0:
+                            continue
+                        ty, tx = divmod(i, cw)
+                        rect = ((cx + tx) * tilewidth, (cy + ty) * tileheight, tilewidth, tileheight)
+                        for k, v in spawner_tiles.items():
+                            if tile_id == v:
+                                spawners[k].append((tile_id, rect))
+                        for k, v in tracker_tiles.items():
+                            if tile_id == v:
+                                trackers[k].append(rect)
+        elif layer["type"] == "objectgroup":
+            w.pack("B", OBJECT_LAYER)
+            w.string(layer["name"])
+            w.pack("BI", layer["visible"], len(layer["objects"]))
+            for obj in layer["objects"]:
+                w.pack("dddd", obj["x"], obj["y"], obj["width"], obj["height"])
+                points = array("d")
+                if "polygon" in obj:
+                    for p in obj["polygon"]:
+                        points.append(p["x"])
+                        points.append(p["y"])
+                w.pack("B", "polygon" in obj)
+                w.array(points)
+        else:
+            w.pack("B", 255)
+
+    # Find spawner tags that're at the same coordinate as the tracker tags,
+    # the last spawner at a coordinate wins like it used to
+    spawner_at = {}
+    for v in spawners.values():
+        for tile_id, rect in v:
+            spawner_at[rect] = tile_id
+
+    w.pack("I", len(spawners))
+    for k, v in spawners.items():
+        w.string(k)
+        w.pack("I", len(v))
+        for tile_id, rect in v:
+            w.pack("Iiiii", tile_id, *rect)
+
+    w.pack("I", len(trackers))
+    for k, v in trackers.items():
+        w.string(k)
+        w.pack("I", len(v))
+        for rect in v:
+            # 0 is never a spawner id, it's used to store None
+            w.pack("Iiiii", spawner_at.get(rect, 0), *rect)
+
+    return w.getvalue()
+
+def read_map(buffer, offset):
+    r = Reader(buffer, offset)
+    tilewidth, tileheight = r.unpack("II")
+    data = {
+        "tilewidth": tilewidth,
+        "tileheight": tileheight,
+        "layers": [],
+        "spawners": {},
+        "trackers": {},
+    }
+
+    n_layers, = r.unpack("I")
+    for _ in range(n_layers):
+        layer_type, = r.unpack("B")
+        if layer_type == TILE_LAYER:
+            name = r.string()
+            visible, n_chunks = r.unpack("BI")
+            chunks = []
+            for _ in range(n_chunks):
+                x, y, cw, ch = r.unpack("iiII")
+                chunks.append({"x": x, "y": y, "width": cw, "height": ch, "data": r.array("I")})
+            data["layers"].append({"type": "tilelayer", "name": name, "visible": bool(visible), "chunks": chunks})
+        elif layer_type == OBJECT_LAYER:
+            name = r.string()
+            visible, n_objects = r.unpack("BI")
+            objects = []
+            for _ in range(n_objects):
+                x, y, ow, oh = r.unpack("dddd")
+                has_polygon, = r.unpack("B")
+                points = r.array("d")
+                obj = {"x": x, "y": y, "width": ow, "height": oh}
+                if has_polygon:
+                    # Flat list of vertices, x0, y0, x1, y1, ...
+                    obj["polygon"] = points
+                objects.append(obj)
+            data["layers"].append({"type": "objectgroup", "name": name, "visible": bool(visible), "objects": objects})
+
+    n_spawners, = r.unpack("I")
+    for _ in range(n_spawners):
+        k = r.string()
+        n, = r.unpack("I")
+        spawners = []
+        for _ in range(n):
+            tile_id, *rect = r.unpack("Iiiii")
+            spawners.append({"tile_id": tile_id, "rect": tuple(rect)})
+        data["spawners"][k] = spawners
+
+    n_trackers, = r.unpack("I")
+    for _ in range(n_trackers):
+        k = r.string()
+        n, = r.unpack("I")
+        trackers = []
+        for _ in range(n):
+            spawner_id, *rect = r.unpack("Iiiii")
+            trackers.append({"spawner_id": spawner_id or None, "rect": tuple(rect)})
+        data["trackers"][k] = trackers
+
+    return data
+
+# Compile the JSON map and write it to the cache folder
+def build(path, spawner_tiles, tracker_tiles, st=None):
+    st = st or os.stat(path)
+    with open(path, "rb") as f:
+        source = f.read()
+    digest = hashlib.sha1(source).digest()
+    body = compile_map(json.loads(source), spawner_tiles, tracker_tiles)
+    header = HEADER.pack(MAGIC, VERSION, st.st_mtime_ns, st.st_size, digest, tables_key(spawner_tiles, tracker_tiles))
+
+    os.makedirs(map_cache_dir, exist_ok=True)
+    cache_path = get_cache_path(path)
+    # Write to a temporary file first so a half written cache is never read
+    tmp_path = cache_path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(header + body)
+    os.replace(tmp_path, cache_path)
+    return read_map(body, 0)
+
+# Read the compiled map, rebuilding it if the source JSON has changed
+def load(path, spawner_tiles, tracker_tiles):
+    st = os.stat(path)
+    tables = tables_key(spawner_tiles, tracker_tiles)
+    key = (st.st_mtime_ns, st.st_size, tables)
+    if path in loaded and loaded[path][0] == key:
+        return loaded[path][1]
+
+    data = None
+    try:
+        with open(get_cache_path(path), "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+            magic, version, mtime, size, digest, cached_tables = HEADER.unpack_from(m, 0)
+            if magic == MAGIC and version == VERSION and cached_tables == tables:
+                if (mtime, size) == (st.st_mtime_ns, st.st_size):
+                    data = read_map(m, HEADER.size)
+                else:
+                    # The file was touched, only rebuild if the contents actually changed
+                    with open(path, "rb") as source:
+                        if hashlib.sha1(source.read()).digest() == digest:
+                            data = read_map(m, HEADER.size)
+    except (OSError, ValueError, struct.error):
+        # Missing, empty or corrupt cache
+        data = None
+
+    if data is None:
+        try:
+            data = build(path, spawner_tiles, tracker_tiles, st)
+        except OSError:
+            # The cache folder isn't writable, compile in memory only
+            with open(path, "rb") as f:
+                data = read_map(compile_map(json.load(f), spawner_tiles, tracker_tiles), 0)
+
+    loaded[path] = (key, data)
+    return data
+
+def compile_all():
+    import tilemap
+    maps_dir = os.path.join(rs_dir, "maps")
+    for file in sorted(os.listdir(maps_dir)):
+        if file.endswith(".json"):
+            path = os.path.join(maps_dir, file)
+            build(path, tilemap.TiledMap.spawner_tiles, tilemap.TiledMap.tracker_tiles)
+            print("Compiled", file, "->", get_cache_path(path))
+
+
+if __name__ == "__main__":
+    compile_all()
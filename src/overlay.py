@@ -0,0 +1,71 @@
+"""
+-------------------------------------------------
+    Project: Sneaktime
+    Standard: 91906 (AS3.7)
+    School: Tauranga Boys' College
+    Author: Michael Ren
+    Date: 05 OCT 2021
+    Python: 3.9.6
+    License: MIT
+-------------------------------------------------
+"""
+
+import pygame as pg
+from scripts import *
+
+# Semi transparent shapes are queued on a named layer and drawn together when
+# the layer is flushed. Shapes on the same layer overwrite each other instead of
+# stacking up, then the layer is blended onto the screen in one go. Every layer
+# shares one view sized surface and only the area that was drawn on is blitted
+# and cleared again.
+class OverlayCompositor:
+    def __init__(self, game):
+        self.game = game
+        self.surface = None
+        self.layers = {}
+
+    def get_queue(self, layer):
+        if layer not in self.layers:
+            self.layers[layer] = []
+        return self.layers[layer]
+
+    # Shapes are given in world coordinates and moved with the camera when flushed
+    def polygon(self, layer, color, points):
+        self.get_queue(layer).append(("polygon", color, points))
+
+    def ngon(self, layer, color, n, radius, position, angle=0):
+        self.get_queue(layer).append(("lines", color, ngon_points(n, radius, position, angle)))
+
+    # Cover the whole view
+    def fill(self, layer, color):
+        self.get_queue(layer).append(("fill", color, None))
+
+    def clear(self, layer):
+        self.layers.pop(layer, None)
+
+    def flush(self, layer, screen):
+        queue = self.layers.get(layer)
+        if not queue:
+            return
+
+        size = screen.get_size()
+        if not self.surface or self.surface.get_size() != size:
+            self.surface = pg.Surface(size, pg.SRCALPHA)
+
+        apply = self.game.camera.apply
+        dirty = None
+        for shape, color, points in queue:
+            if shape == "polygon":
+                rect = pg.draw.polygon(self.surface, color, [apply(p) for p in points])
+            elif shape == "lines":
+                rect = pg.draw.lines(self.surface, color, True, [apply(p) for p in points], 2)
+            else:
+                rect = self.surface.fill(color)
+            # Shapes that are completely off screen return an empty rect
+            if rect.w and rect.h:
+                dirty = dirty.union(rect) if dirty else rect
+        queue.clear()
+
+        if dirty:
+            screen.blit(self.surface, dirty, dirty)
+            self.surface.fill((0, 0, 0, 0), dirty)
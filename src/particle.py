@@ -1,4 +1,3 @@
-
 """
 -------------------------------------------------
     Project: Sneaktime
@@ -11,54 +10,95 @@
 -------------------------------------------------
 """
 
-import random, math
+import numpy as np
 import pygame as pg
+import circlecache
+import rng
 
+# Particles are stored as columns of preallocated arrays instead of one object each,
+# so updating them is a few array operations no matter how many there are
 class ParticleManager:
-    def __init__(self, game):
+    def __init__(self, game, capacity=1024):
         self.game = game
-        self.particles = []
+        self.rng = rng.get_numpy("particle")
+        self.count = 0
+        self.allocate(capacity)
+
+    def allocate(self, capacity):
+        self.capacity = capacity
+        self.pos = np.zeros((capacity, 2))
+        self.prev_pos = np.zeros((capacity, 2)) # Position before the last update, for drawing in between
+        self.vel = np.zeros((capacity, 2))
+        self.radius = np.zeros(capacity)
+        self.lifespan = np.zeros(capacity)
+        self.counter = np.zeros(capacity)
+        self.color = np.zeros((capacity, 3), np.uint8)
 
-    def add(self, p):
-        self.particles.append(p)
+    # Double the size of the pool, keeping the live particles
+    def grow(self, needed):
+        capacity = self.capacity
+        while capacity < needed:
+            capacity *= 2
+        old = (self.pos, self.prev_pos, self.vel, self.radius, self.lifespan, self.counter, self.color)
+        self.allocate(capacity)
+        n = self.count
+        for new, a in zip((self.pos, self.prev_pos, self.vel, self.radius, self.lifespan, self.counter, self.color), old):
+            new[:n] = a[:n]
 
     def generate(self, x, y, color, minmax=(5, 10)):
-        for i in range(random.randint(*minmax)):
-            self.game.particle_manager.add(Particle(x, y, color))
+        n = int(self.rng.integers(minmax[0], minmax[1] + 1))
+        if self.count + n > self.capacity:
+            self.grow(self.count + n)
+        a = self.count
+        b = a + n
+        speed = self.rng.integers(200, 401, n)
+        angle = np.radians(self.rng.integers(0, 361, n))
+        self.pos[a:b] = (x, y)
+        self.prev_pos[a:b] = (x, y)
+        self.vel[a:b, 0] = np.cos(angle) * speed
+        self.vel[a:b, 1] = np.sin(angle) * speed
+        self.radius[a:b] = self.rng.integers(4, 9, n)
+        self.lifespan[a:b] = self.rng.uniform(0.3, 1, n)
+        self.counter[a:b] = 0
+        self.color[a:b] = color
+        self.count = b
 
     def update(self, dt):
-        for i, p in reversed(list(enumerate(self.particles))):
-            p.update(dt)
-            if p.is_dead() == True:
-                del self.particles[i]
+        n = self.count
+        if n:
+            self.prev_pos[:n] = self.pos[:n]
+            self.pos[:n] += self.vel[:n] * dt
+            self.counter[:n] += dt
+            self.radius[:n] -= (self.radius[:n] / self.lifespan[:n]) * dt
+
+            # Move the live particles to the front of the arrays, keeping their order
+            alive = np.flatnonzero(self.counter[:n] <= self.lifespan[:n])
+            if len(alive) < n:
+                for a in (self.pos, self.prev_pos, self.vel, self.radius, self.lifespan, self.counter, self.color):
+                    a[:len(alive)] = a[alive]
+                self.count = len(alive)
 
     def reset(self):
-        self.particles = []
+        self.count = 0
 
     def draw(self, screen):
-        for p in self.particles:
-            p.draw(screen)
-
+        # Everything is drawn from cached circle sprites in one batch
+        blits = []
 
-class Particle:
-    def __init__(self, x, y, color=(0,0,0)):
-        self.pos = pg.Vector2(x, y)
-        self.speed = random.randint(200, 400)
-        self.radius = random.randint(4, 8)
-        self.angle = math.radians(random.randint(0, 360))
-        self.color = color
-        self.lifespan = random.uniform(0.3, 1)
-        self.counter = 0
+        n = self.count
+        if n:
+            offset = self.game.camera.offset
+            sw, sh = screen.get_size()
+            # Positions and radii are truncated like pg.draw.circle does
+            radius = self.radius[:n].astype(int)
+            prev = self.prev_pos[:n]
+            pos = (prev + (self.pos[:n] - prev) * self.game.alpha - (offset.x, offset.y)).astype(int)
+            x = pos[:, 0] - radius
+            y = pos[:, 1] - radius
+            # Skip particles that have shrunk away or are off screen
+            visible = np.flatnonzero((radius >= 1) & (x < sw) & (y < sh) & (x + 2 * radius >= 0) & (y + 2 * radius >= 0))
+            get = circlecache.cache.get
+            for c, r, px, py in zip(self.color[visible].tolist(), radius[visible].tolist(), x[visible].tolist(), y[visible].tolist()):
+                blits.append((get(c, r), (px, py)))
 
-    def is_dead(self):
-        if self.counter > self.lifespan:
-            return True
-
-    def update(self, dt):
-        self.pos.x += math.cos(self.angle) * self.speed * dt
-        self.pos.y += math.sin(self.angle) * self.speed * dt
-        self.counter += dt
-        self.radius -= (self.radius / self.lifespan) * dt
-
-    def draw(self, screen):
-        pg.draw.circle(screen, self.color, self.pos, self.radius)
\ No newline at end of file
+        screen.blits(blits, doreturn=False)
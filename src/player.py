@@ -11,20 +11,23 @@
 -------------------------------------------------
 """
 
-import random
 import pygame as pg
 import inventory
-import bullet
 import ui
+import rng
 from collision import *
 from settings import *
 from scripts import *
 
+# The player draws its random numbers from its own stream
+player_random = rng.get("player")
+
 class Player:
     def __init__(self, game):
         self.game = game
 
         self.pos = pg.Vector2(0, 0)
+        self.prev_pos = pg.Vector2(0, 0) # Position before the last update, for drawing in between
         self.vel = pg.Vector2()
         self.max_vel = 260
         self.friction = 0.85
@@ -59,12 +62,11 @@ class Player:
         self.collision_obj = Circle(Vector(*self.c_pos), self.img_w/2)
 
         self.has_armour = False
-        self.transparent_surface = pg.Surface(WORLD_SIZE, pg.SRCALPHA)
         self.idle_armour_radius = self.img_w * 0.6
         self.idle_armour_counter = 0
         self.active_armour_radius = 0
         self.max_active_armour_radius = self.img_w * 3
-        self.active_armour_angle = random.uniform(0, math.pi*2)
+        self.active_armour_angle = player_random.uniform(0, math.pi*2)
         self.armour_is_active = False
 
         # Interface stuff
@@ -74,8 +76,8 @@ class Player:
         self.inventory_message = None
 
     def load_sprite(self):
-        self.img = pg.image.load(self.game.get_themed_path("characters", "player.png")).convert_alpha()
-        self.enemy_img = pg.image.load(self.game.get_themed_path("characters", "enemy.png")).convert_alpha()
+        self.img = self.game.load_image("characters", "player.png")
+        self.enemy_img = self.game.load_image("characters", "enemy.png")
 
     def reset(self):
         self.mode = "move"
@@ -119,11 +121,11 @@ class Player:
         if self.can_shoot:
             sound_effects["shoot"].play()
             if self.inventory.has_powerup("shotgun"):
-                self.game.particle_manager.add(bullet.Bullet(self.game, *self.c_pos, self.angle, "player"))
+                self.game.projectile_manager.add(*self.c_pos, self.angle, "player")
                 for i in range(4):
-                    self.game.particle_manager.add(bullet.Bullet(self.game, *self.c_pos, self.angle + random.uniform(-1,1), "player"))
+                    self.game.projectile_manager.add(*self.c_pos, self.angle + player_random.uniform(-1,1), "player")
             else:
-                self.game.particle_manager.add(bullet.Bullet(self.game, *self.c_pos, self.angle, "player"))
+                self.game.projectile_manager.add(*self.c_pos, self.angle, "player")
             # Set kickback velocity (opposite to the bullet's velocity)
             self.vel.x -= math.cos(self.angle) * self.max_vel
             self.vel.y -= math.sin(self.angle) * self.max_vel
@@ -134,7 +136,7 @@ class Player:
     def boss_collide(self):
         all_collisions = []
         if self.game.level_manager.current_level == len(self.game.level_manager.levels) - 1:
-            for e in self.game.enemy_manager.entities:
+            for e in self.game.spatial_hash.nearby(self.collision_obj):
                 if type(e).__name__ == "Boss":
                     r = Response()
                     if collide(self.collision_obj, e.collision_obj, r):
@@ -155,7 +157,7 @@ class Player:
         self.c_pos = center(*self.pos, self.img_w, self.img_h)
         self.collision_obj.pos = Vector(*self.c_pos)
 
-        all_collisions = self.boss_collide() + self.game.level_manager.current_map().poly_collide(self.collision_obj, capture_all=True, exclude_layer_name="exit")
+        all_collisions = self.boss_collide() + self.game.level_manager.current_map().circle_collide(self.collision_obj, include_exit=False)
         if all_collisions:
             for c in all_collisions:
                 self.pos.x -= c.x
@@ -187,7 +189,8 @@ class Player:
             sound_effects["footstep"].play()
 
     def update(self, dt):
-        keys = pg.key.get_pressed()
+        self.prev_pos = self.pos.copy()
+        keys = self.game.input.get_pressed()
 
         if self.alive:
             self.gameplay_timer += dt / self.game.speed or 1
@@ -322,7 +325,7 @@ class Player:
                 if diff < 0.01:
                     self.armour_is_active = False
                     self.active_armour_radius = 0
-                    self.active_armour_angle = random.uniform(0, math.pi*2)
+                    self.active_armour_angle = player_random.uniform(0, math.pi*2)
         else:
             self.idle_armour_counter = 0
             self.armour_is_active = False
@@ -332,28 +335,30 @@ class Player:
         self.game.camera.track((self.pos.x, self.pos.y, self.img_w, self.img_h))
 
     def draw(self, screen):
+        pos = self.game.lerp(self.prev_pos, self.pos)
+        c_pos = center(*pos, self.img_w, self.img_h)
+
         if self.mode == "aim":
             # Draw aiming lines
-            end_pos = pg.Vector2(self.c_pos.x + math.cos(self.angle)*self.aim_line_length, self.c_pos.y + math.sin(self.angle)*self.aim_line_length)
-            pg.draw.circle(screen, self.game.get_color("primary"), end_pos, 5)
+            end_pos = pg.Vector2(c_pos.x + math.cos(self.angle)*self.aim_line_length, c_pos.y + math.sin(self.angle)*self.aim_line_length)
+            pg.draw.circle(screen, self.game.get_color("primary"), self.game.camera.apply(end_pos), 5)
 
         # Draw self
         if self.inventory.has_powerup("disguise"):
-            screen.blit(self.enemy_img, self.pos)
+            screen.blit(self.enemy_img, self.game.camera.apply(pos))
         else:
-            screen.blit(self.img, self.pos)
+            screen.blit(self.img, self.game.camera.apply(pos))
 
         # Draw idle armour
         if self.has_armour:
             change = (math.sin(self.idle_armour_counter) + 1) * 10
-            pg.draw.circle(screen, self.game.get_color("primary"), self.c_pos, self.idle_armour_radius + change, 2)
+            pg.draw.circle(screen, self.game.get_color("primary"), self.game.camera.apply(c_pos), self.idle_armour_radius + change, 2)
 
         # Draw active armour
         if self.armour_is_active:
             opacity = (self.max_active_armour_radius - self.active_armour_radius)
             if opacity > 255: opacity = 255
             elif opacity < 0: opacity = 0
-            draw_ngon(self.transparent_surface, (*self.game.get_color("primary"), opacity), 5, self.active_armour_radius, self.c_pos, self.active_armour_angle)
-            screen.blit(self.transparent_surface, (0, 0))
-            self.transparent_surface.fill((0, 0, 0, 0))
+            self.game.overlay.ngon("armour", (*self.game.get_color("primary"), opacity), 5, self.active_armour_radius, c_pos, self.active_armour_angle)
+            self.game.overlay.flush("armour", screen)
 
@@ -0,0 +1,162 @@
+"""
+-------------------------------------------------
+    Project: Sneaktime
+    Standard: 91906 (AS3.7)
+    School: Tauranga Boys' College
+    Author: Michael Ren
+    Date: 05 OCT 2021
+    Python: 3.9.6
+    License: MIT
+-------------------------------------------------
+"""
+
+import time
+from collections import deque
+import pygame as pg
+import ui
+from settings import *
+
+# Times every manager's update and draw, and shows the averages over the last
+# few seconds on top of the game. Press F3 (or start with "--profile") to turn it on.
+#
+# When it is off, timed() hands back the function it was given, so the only cost
+# is one extra method call per manager per frame.
+class Profiler:
+    def __init__(self, game, window=120):
+        self.game = game
+        self.window = window # Frames kept for the averages and the graph
+        self.enabled = False
+        self.panel = None
+        self.reset()
+        if profile:
+            self.toggle()
+
+    def reset(self):
+        self.current = {}
+        self.history = {}
+        self.frames = deque(maxlen=self.window)
+        self.frame_start = None
+
+    def toggle(self):
+        self.enabled = not self.enabled
+        self.reset()
+
+    # phase is "update" or "draw"
+    def timed(self, phase, name, fn):
+        if not self.enabled:
+            return fn
+        def timed_fn(*args):
+            start = time.perf_counter_ns()
+            result = fn(*args)
+            self.add((phase, name), time.perf_counter_ns() - start)
+            return result
+        return timed_fn
+
+    def add(self, key, ns):
+        self.current[key] = self.current.get(key, 0) + ns
+
+    def start_frame(self):
+        if self.enabled:
+            self.frame_start = time.perf_counter_ns()
+
+    def end_frame(self):
+        if not self.enabled or self.frame_start is None:
+            return
+        self.frames.append(time.perf_counter_ns() - self.frame_start)
+        # Managers that didn't run this frame took no time
+        for key in self.current:
+            if key not in self.history:
+                self.history[key] = deque(maxlen=self.window)
+        for key, times in self.history.items():
+            times.append(self.current.get(key, 0))
+        self.current = {}
+
+    # Average milliseconds per frame
+    def get_average(self, times):
+        return sum(times) / len(times) / 1e6 if times else 0
+
+    def get_rows(self):
+        names = []
+        for _, name in self.history:
+            if name not in names:
+                names.append(name)
+        rows = []
+        for name in names:
+            update = self.get_average(self.history.get(("update", name)))
+            draw = self.get_average(self.history.get(("draw", name)))
+            rows.append((name, update, draw))
+        # Time spent outside the managers (events, scaling the screen, showing it)
+        other = self.get_average(self.frames) - sum(u + d for _, u, d in rows)
+        rows.append(("other", max(other, 0), 0))
+        return rows
+
+    def get_counts(self):
+        game = self.game
+        return [
+            ("enemies", len(game.enemy_manager.entities)),
+            ("bullets", game.projectile_manager.count),
+            ("particles", game.particle_manager.count),
+            ("items", len(game.item_manager.items)),
+            ("traps", len(game.trap_manager.traps)),
+        ]
+
+    # Text that changes every frame is put together from single glyphs instead of cached lines
+    def draw_text(self, screen, glyphs, text, x, y):
+        screen.blits([(glyphs.get_glyph(char), (x + glyphs.cw * i, y)) for i, char in enumerate(text) if char != " "], doreturn=False)
+
+    def draw(self, screen):
+        if not self.enabled or not self.frames:
+            return
+        primary = self.game.get_color("primary")
+        secondary = self.game.get_color("secondary")
+        glyphs = ui.get_glyph_atlas(12, self.game.get_color("text"))
+        cw, ch = glyphs.cw, glyphs.ch
+        budget = 1000 / max_fps # Milliseconds a frame can take
+        bar_width = 100
+        rows = self.get_rows()
+        counts = self.get_counts()
+        graph_height = 40
+
+        width = max(cw * 24 + bar_width, self.window + cw * 22) + 16
+        height = ch * (len(rows) + 3 + (len(counts) + 2) // 3) + graph_height + 32
+        if not self.panel or self.panel.get_size() != (width, height):
+            self.panel = pg.Surface((width, height), pg.SRCALPHA)
+        self.panel.fill((*self.game.get_color("background"), 200))
+        screen.blit(self.panel, (8, 8))
+        x = 16
+        y = 16
+
+        # Header, then one row per manager with its update (primary) and draw (secondary) time
+        self.draw_text(screen, glyphs, f"{'':10}{'update':>7}{'draw':>7}", x, y)
+        y += ch
+        for name, update, draw in rows:
+            self.draw_text(screen, glyphs, f"{name[:10]:10}{update:7.2f}{draw:7.2f}", x, y)
+            bx = x + cw * 24
+            update_width = min(update / budget, 1) * bar_width
+            draw_width = min(draw / budget, 1 - update_width / bar_width) * bar_width
+            pg.draw.rect(screen, primary, (bx, y + 3, update_width, ch - 6))
+            pg.draw.rect(screen, secondary, (bx + update_width, y + 3, draw_width, ch - 6))
+            y += ch
+
+        # Frame times, the line is the frame budget
+        y += 8
+        frames = list(self.frames)
+        average = self.get_average(frames)
+        scale = graph_height / (budget * 2)
+        for i, ns in enumerate(frames):
+            h = min(ns / 1e6 * scale, graph_height)
+            pg.draw.line(screen, primary, (x + i, y + graph_height), (x + i, y + graph_height - h))
+        pg.draw.line(screen, secondary, (x, y + graph_height - budget * scale), (x + self.window, y + graph_height - budget * scale))
+        self.draw_text(screen, glyphs, f"{average:5.2f}ms max {max(frames) / 1e6:5.2f}ms", x + self.window + 8, y)
+        y += graph_height + 8
+
+        # Entity counts, three to a line
+        for i in range(0, len(counts), 3):
+            self.draw_text(screen, glyphs, " ".join(f"{name} {count}" for name, count in counts[i:i+3]), x, y)
+            y += ch
+
+        # Shared sprites and fonts, and how often they were found in the cache
+        stats = self.game.assets.stats()
+        self.draw_text(screen, glyphs, f"images {stats['images']} {stats['image_bytes'] / 1e6:.1f}MB fonts {stats['fonts']}", x, y)
+        y += ch
+        self.draw_text(screen, glyphs, f"cache hits {stats['hits']} misses {stats['misses']}", x, y)
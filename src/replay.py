@@ -0,0 +1,237 @@
+"""
+-------------------------------------------------
+    Project: Sneaktime
+    Standard: 91906 (AS3.7)
+    School: Tauranga Boys' College
+    Author: Michael Ren
+    Date: 05 OCT 2021
+    Python: 3.9.6
+    License: MIT
+-------------------------------------------------
+"""
+
+import os, json, atexit, zlib
+import pygame as pg
+import controls
+import enemy
+import rng
+from mapcache import Writer, Reader
+from settings import *
+
+# A recording is the random seed, the save the run started from and, for every
+# update, the keys that were held and the dt. Playing it back feeds the same keys
+# and dt into the same seeded game, so it goes through exactly the same states.
+#
+# Usage:
+#     python main.py -d --record run.rec --seed 42
+#     python main.py -d --replay run.rec    (add --headless to check it as fast as possible)
+
+MAGIC = b"STREC"
+VERSION = 1
+
+# The keys the game reads, stored as one bit each
+KEYS = [pg.K_LEFT, pg.K_RIGHT, pg.K_UP, pg.K_DOWN, pg.K_SPACE, pg.K_e]
+
+# Each frame starts with flags saying what changed since the frame before,
+# only the changes are stored and runs of unchanged frames are stored as a count
+KEYS_CHANGED = 1
+DT_CHANGED = 2
+WINDOW_CHANGED = 4
+CHECKSUM = 8
+REPEAT = 16
+
+# Frames between state checksums, used to find where a replay stops matching
+CHECKSUM_INTERVAL = 60
+
+# Everything that should be the same at the same frame of a recording and its replay
+def get_checksum(game):
+    p = game.player
+    level_manager = game.level_manager
+    store = game.enemy_manager.store
+    w = Writer()
+    w.string(game.mode)
+    w.pack("i??dd", level_manager.current_level, bool(level_manager.lockdown), bool(p.alive), p.pos.x, p.pos.y)
+    w.parts.append(store.pos[:store.count].astype("<f8").tobytes())
+    for e in game.enemy_manager.entities:
+        if isinstance(e, enemy.Boss):
+            w.pack("i", e.health)
+    w.string(",".join(item.name for item in p.inventory.items))
+    w.string(",".join(powerup.name for powerup in p.inventory.powerups))
+    return zlib.crc32(w.getvalue())
+
+def get_mask(keys):
+    mask = 0
+    for i, key in enumerate(KEYS):
+        if keys[key]:
+            mask |= 1 << i
+    return mask
+
+def get_keys(mask):
+    return [key for i, key in enumerate(KEYS) if mask & (1 << i)]
+
+
+class Recorder:
+    writes_save = True
+
+    def __init__(self, game, path, seed=None):
+        self.game = game
+        self.path = path
+        self.seed = seed if seed is not None else int.from_bytes(os.urandom(4), "little")
+        rng.seed(self.seed)
+        # The run depends on the progress it started from
+        self.save_data = game.read_save()
+
+        # Keys are read from the keyboard once per update and held for the whole update
+        self.source = game.input
+        game.input = controls.ScriptedInput()
+
+        self.window = tuple(game.window.get_size())
+        self.header = {
+            "seed": self.seed,
+            "window": self.window,
+            "save": self.save_data,
+        }
+        # Set when the run skips the menus and starts straight in a level
+        self.start_level = None
+        self.frames = Writer()
+        self.frame = 0
+        self.repeat = 0
+        self.mask = 0
+        self.dt = None
+        self.closed = False
+        atexit.register(self.close)
+
+    def flush_repeat(self):
+        while self.repeat:
+            count = min(self.repeat, 0xFFFF)
+            self.frames.pack("BH", REPEAT, count)
+            self.repeat -= count
+
+    def update(self, dt):
+        mask = get_mask(self.source.get_pressed())
+        self.game.input.set_pressed(get_keys(mask))
+        window = tuple(self.game.window.get_size())
+
+        flags = 0
+        if mask != self.mask:
+            flags |= KEYS_CHANGED
+        if dt != self.dt:
+            flags |= DT_CHANGED
+        if window != self.window:
+            flags |= WINDOW_CHANGED
+        if self.frame % CHECKSUM_INTERVAL == 0:
+            flags |= CHECKSUM
+
+        if flags:
+            self.flush_repeat()
+            self.frames.pack("B", flags)
+            if flags & KEYS_CHANGED:
+                self.frames.pack("H", mask)
+            if flags & DT_CHANGED:
+                self.frames.pack("d", dt)
+            if flags & WINDOW_CHANGED:
+                self.frames.pack("HH", *window)
+            if flags & CHECKSUM:
+                self.frames.pack("I", get_checksum(self.game))
+        else:
+            self.repeat += 1
+
+        self.mask = mask
+        self.dt = dt
+        self.window = window
+        self.frame += 1
+        return dt
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        self.flush_repeat()
+        self.header["level"] = self.start_level
+        w = Writer()
+        w.pack("5sH", MAGIC, VERSION)
+        w.string(json.dumps(self.header))
+        w.pack("I", self.frame)
+        w.parts.append(self.frames.getvalue())
+        # Write to a temporary file first so a half written recording is never read
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(w.getvalue())
+        os.replace(tmp_path, self.path)
+        print(f"Recorded {self.frame} frames to {self.path}")
+
+
+class Replayer:
+    writes_save = False
+
+    def __init__(self, game, path):
+        self.game = game
+        with open(path, "rb") as f:
+            r = Reader(f.read())
+        magic, version = r.unpack("5sH")
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a recording this version of the game can play")
+        header = json.loads(r.string())
+        frame_count, = r.unpack("I")
+
+        rng.seed(header["seed"])
+        self.save_data = header["save"]
+        self.start_level = header.get("level")
+        game.input = controls.ScriptedInput()
+        self.set_window(header["window"])
+
+        # Undo the delta encoding, one (mask, dt, window, checksum) per frame
+        self.frames = []
+        mask, dt, window = 0, None, tuple(header["window"])
+        while len(self.frames) < frame_count:
+            flags, = r.unpack("B")
+            if flags == REPEAT:
+                count, = r.unpack("H")
+                self.frames.extend([(mask, dt, window, None)] * count)
+                continue
+            checksum = None
+            if flags & KEYS_CHANGED:
+                mask, = r.unpack("H")
+            if flags & DT_CHANGED:
+                dt, = r.unpack("d")
+            if flags & WINDOW_CHANGED:
+                window = r.unpack("HH")
+            if flags & CHECKSUM:
+                checksum, = r.unpack("I")
+            self.frames.append((mask, dt, window, checksum))
+
+        self.frame = 0
+        self.checked = 0
+        self.diverged_frame = None
+
+    def set_window(self, size):
+        if tuple(self.game.window.get_size()) != tuple(size):
+            self.game.window = pg.display.set_mode(size, pg.RESIZABLE)
+
+    def is_done(self):
+        return self.frame >= len(self.frames)
+
+    # Replaces the frame's dt and keys with the recorded ones
+    def update(self, dt):
+        if self.is_done():
+            return dt
+        mask, dt, window, checksum = self.frames[self.frame]
+        self.game.input.set_pressed(get_keys(mask))
+        self.set_window(window)
+        if checksum is not None:
+            self.checked += 1
+            if self.diverged_frame is None and get_checksum(self.game) != checksum:
+                self.diverged_frame = self.frame
+                print(f"Replay diverged from the recording at frame {self.frame}")
+        self.frame += 1
+
+        if self.is_done():
+            if self.diverged_frame is None:
+                print(f"Replayed {self.frame} frames, all {self.checked} checksums matched")
+            # Hand control back to the player
+            self.game.input = controls.ScriptedInput() if headless else controls.KeyboardInput()
+            self.game.recorder = None
+        return dt
+
+    def close(self):
+        pass
@@ -0,0 +1,46 @@
+"""
+-------------------------------------------------
+    Project: Sneaktime
+    Standard: 91906 (AS3.7)
+    School: Tauranga Boys' College
+    Author: Michael Ren
+    Date: 05 OCT 2021
+    Python: 3.9.6
+    License: MIT
+-------------------------------------------------
+"""
+
+import random, zlib
+import numpy as np
+
+# Every part of the game draws its random numbers from its own named stream instead
+# of the global random module. Seeding them makes a run repeatable, and one part
+# drawing more numbers (e.g. more particles) doesn't change what the others get.
+#
+# Streams are seeded from the system until seed() is called, seed() reseeds the
+# existing streams in place so parts that already hold one stay in sync.
+
+streams = {}
+numpy_streams = {}
+current_seed = None
+
+def get_stream_seed(name):
+    return zlib.crc32(name.encode(), current_seed & 0xFFFFFFFF)
+
+def get(name):
+    if name not in streams:
+        streams[name] = random.Random(None if current_seed is None else get_stream_seed(name))
+    return streams[name]
+
+def get_numpy(name):
+    if name not in numpy_streams:
+        numpy_streams[name] = np.random.default_rng(None if current_seed is None else get_stream_seed(name))
+    return numpy_streams[name]
+
+def seed(value):
+    global current_seed
+    current_seed = value
+    for name, stream in streams.items():
+        stream.seed(get_stream_seed(name))
+    for name, stream in numpy_streams.items():
+        stream.bit_generator.state = np.random.PCG64(get_stream_seed(name)).state
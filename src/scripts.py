@@ -26,6 +26,9 @@ def brightness(r, g, b):
 
 # Draw n sided regular polygons
 # https://stackoverflow.com/questions/29064259/drawing-pentagon-hexagon-in-pygame
-def draw_ngon(Surface, color, n, radius, position, angle=0):
+def ngon_points(n, radius, position, angle=0):
     pi2 = math.pi * 2
-    return pg.draw.lines(Surface, color, True, [(math.cos(i / n * pi2 + angle) * radius + position[0], math.sin(i / n * pi2 + angle) * radius + position[1]) for i in range(0, n)], 2)
+    return [(math.cos(i / n * pi2 + angle) * radius + position[0], math.sin(i / n * pi2 + angle) * radius + position[1]) for i in range(0, n)]
+
+def draw_ngon(Surface, color, n, radius, position, angle=0):
+    return pg.draw.lines(Surface, color, True, ngon_points(n, radius, position, angle), 2)
@@ -0,0 +1,166 @@
+"""
+-------------------------------------------------
+    Project: Sneaktime
+    Standard: 91906 (AS3.7)
+    School: Tauranga Boys' College
+    Author: Michael Ren
+    Date: 05 OCT 2021
+    Python: 3.9.6
+    License: MIT
+-------------------------------------------------
+"""
+
+import os, math, zlib
+import numpy as np
+from settings import *
+
+# A signed distance field stores the distance from points on a grid to the nearest
+# polygon edge, negative inside the polygons. Between the grid points the distance
+# is interpolated, so how far a circle is from the walls (and which way is out)
+# takes four lookups no matter how many polygons are nearby.
+#
+# Distances are only worked out up to "band" pixels away from the polygons,
+# anything further away is treated as exactly that far.
+class DistanceField:
+    def __init__(self, x, y, size, distance, band):
+        self.x = x
+        self.y = y
+        self.size = size
+        self.band = band
+        self.distance = distance
+        self.rows, self.cols = distance.shape
+        # Plain list for fast single lookups
+        self.values = distance.ravel().tolist()
+
+    # Distance and gradient (the direction away from the nearest wall) at a point
+    def sample(self, px, py):
+        gx = (px - self.x) / self.size
+        gy = (py - self.y) / self.size
+        col = math.floor(gx)
+        row = math.floor(gy)
+        if not (0 <= col < self.cols - 1 and 0 <= row < self.rows - 1):
+            return self.band, 0, 0
+        fx = gx - col
+        fy = gy - row
+        i = row * self.cols + col
+        d00 = self.values[i]
+        d10 = self.values[i + 1]
+        d01 = self.values[i + self.cols]
+        d11 = self.values[i + self.cols + 1]
+        d = (d00 * (1 - fx) + d10 * fx) * (1 - fy) + (d01 * (1 - fx) + d11 * fx) * fy
+        ddx = ((d10 - d00) * (1 - fy) + (d11 - d01) * fy) / self.size
+        ddy = ((d01 - d00) * (1 - fx) + (d11 - d10) * fx) / self.size
+        return d, ddx, ddy
+
+    # Distances at many points at once
+    def sample_many(self, px, py):
+        gx = (np.asarray(px) - self.x) / self.size
+        gy = (np.asarray(py) - self.y) / self.size
+        col = np.floor(gx).astype(int)
+        row = np.floor(gy).astype(int)
+        inside = (col >= 0) & (col < self.cols - 1) & (row >= 0) & (row < self.rows - 1)
+        col = np.where(inside, col, 0)
+        row = np.where(inside, row, 0)
+        fx = gx - col
+        fy = gy - row
+        d = self.distance
+        result = (d[row, col] * (1 - fx) + d[row, col + 1] * fx) * (1 - fy) + (d[row + 1, col] * (1 - fx) + d[row + 1, col + 1] * fx) * fy
+        return np.where(inside, result, self.band)
+
+
+# Edges that are covered by a neighbouring polygon aren't walls anything can touch
+def get_outer_edges(polygons):
+    edges = []
+    for i, points in enumerate(polygons):
+        cx = sum(x for x, _ in points) / len(points)
+        cy = sum(y for _, y in points) / len(points)
+        for (ax, ay), (bx, by) in zip(points, points[1:] + points[:1]):
+            ex = bx - ax
+            ey = by - ay
+            length = math.hypot(ex, ey)
+            if not length:
+                continue
+            # Just outside the middle of the edge
+            nx = ey / length
+            ny = -ex / length
+            if (ax - cx) * nx + (ay - cy) * ny < 0:
+                nx, ny = -nx, -ny
+            mx = (ax + bx) / 2 + nx * 0.5
+            my = (ay + by) / 2 + ny * 0.5
+            if not any(j != i and contains(other, mx, my) for j, other in enumerate(polygons)):
+                edges.append((ax, ay, bx, by))
+    return edges
+
+def contains(points, x, y):
+    sides = [(bx - ax) * (y - ay) - (by - ay) * (x - ax) for (ax, ay), (bx, by) in zip(points, points[1:] + points[:1])]
+    return all(s > 0 for s in sides) or all(s < 0 for s in sides)
+
+# Polygons are lists of (x, y) points, all polygons must be convex
+def build(polygons, x, y, cols, rows, size, band):
+    distance = np.full((rows, cols), band, np.float32)
+    inside = np.zeros((rows, cols), bool)
+
+    def get_region(x1, y1, x2, y2):
+        col1 = max(math.floor((x1 - x) / size), 0)
+        row1 = max(math.floor((y1 - y) / size), 0)
+        col2 = min(math.ceil((x2 - x) / size), cols - 1)
+        row2 = min(math.ceil((y2 - y) / size), rows - 1)
+        px, py = np.meshgrid(x + np.arange(col1, col2 + 1) * size, y + np.arange(row1, row2 + 1) * size)
+        return (slice(row1, row2 + 1), slice(col1, col2 + 1)), px, py
+
+    # Distance to each edge, only near the edge
+    for ax, ay, bx, by in get_outer_edges(polygons):
+        region, px, py = get_region(min(ax, bx) - band, min(ay, by) - band, max(ax, bx) + band, max(ay, by) + band)
+        ex = bx - ax
+        ey = by - ay
+        t = np.clip(((px - ax) * ex + (py - ay) * ey) / (ex * ex + ey * ey), 0, 1)
+        d = np.hypot(ax + ex * t - px, ay + ey * t - py)
+        distance[region] = np.minimum(distance[region], d)
+
+    # Points inside any polygon are negative
+    for points in polygons:
+        xs = [p[0] for p in points]
+        ys = [p[1] for p in points]
+        region, px, py = get_region(min(xs), min(ys), max(xs), max(ys))
+        positive = np.ones(px.shape, bool)
+        negative = np.ones(px.shape, bool)
+        for (ax, ay), (bx, by) in zip(points, points[1:] + points[:1]):
+            s = (bx - ax) * (py - ay) - (by - ay) * (px - ax)
+            positive &= s >= 0
+            negative &= s <= 0
+        inside[region] |= positive | negative
+
+    distance[inside] = -distance[inside]
+    return distance
+
+# Load the distance field from next to the compiled map, building it if the polygons have changed
+def load(name, polygons, bounds, size, band=64):
+    x1, y1, x2, y2 = bounds
+    x = math.floor((x1 - band) / size) * size
+    y = math.floor((y1 - band) / size) * size
+    cols = math.ceil((x2 + band - x) / size) + 1
+    rows = math.ceil((y2 + band - y) / size) + 1
+    key = zlib.crc32(repr((polygons, x, y, cols, rows, size, band)).encode())
+
+    path = os.path.join(map_cache_dir, name + ".npz")
+    distance = None
+    try:
+        with np.load(path) as f:
+            if int(f["key"]) == key:
+                distance = f["distance"]
+    except (OSError, KeyError, ValueError):
+        # Missing or corrupt
+        distance = None
+
+    if distance is None:
+        distance = build(polygons, x, y, cols, rows, size, band)
+        try:
+            os.makedirs(map_cache_dir, exist_ok=True)
+            # Write to a temporary file first so a half written field is never read
+            tmp_path = path + ".tmp.npz"
+            np.savez(tmp_path, key=np.uint32(key), distance=distance)
+            os.replace(tmp_path, path)
+        except OSError:
+            # The cache folder isn't writable, keep it in memory only
+            pass
+    return DistanceField(x, y, size, distance, band)
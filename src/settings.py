@@ -15,6 +15,16 @@ import sys, os
 import pygame as pg
 from pathlib import Path
 
+# Run the game logic without a window or sound, e.g. "--headless --frames 6000 --level 3"
+# Headless runs start from an empty save and never write one
+headless = "--headless" in sys.argv
+headless_frames = int(sys.argv[sys.argv.index("--frames") + 1]) if "--frames" in sys.argv else 600 # Also the frames per level for --bench
+headless_level = int(sys.argv[sys.argv.index("--level") + 1]) if "--level" in sys.argv else 0
+if headless:
+	# Must be set before pygame starts
+	os.environ["SDL_VIDEODRIVER"] = "dummy"
+	os.environ["SDL_AUDIODRIVER"] = "dummy"
+
 pg.init()
 
 BASE_DIR = Path(os.path.dirname(__file__))
@@ -22,12 +32,40 @@ WINDOW_SIZE = W_WIDTH, W_HEIGHT = 640, 480
 WORLD_SIZE = (640*4, 480*4)
 
 cache_path = os.path.join(BASE_DIR.parent, "cache.json")
+map_cache_dir = os.path.join(BASE_DIR.parent, "map_cache") # Compiled maps
+
+# The game is simulated in fixed steps of 1/tick_rate seconds and drawn up to max_fps times a second,
+# frames that land between two steps show everything part way between them
+fixed_timestep = True
+tick_rate = 60
+max_fps = 60
+max_catch_up_steps = 5 # After a long stall the game slows down for a moment instead of jumping ahead
+max_step = 0.1 # Longest single update in seconds, the same goes for updates that aren't fixed steps
 rs_dir = os.path.join(BASE_DIR.parent.parent, "resources") # Production
 
 # Change resource directory while running with debug flag
 if "-d" in sys.argv or "-debug" in sys.argv:
 	rs_dir = os.path.join(BASE_DIR, "resources") # Development
 
+# Change the draw and simulation rates, e.g. "--fps 30" on slow machines
+if "--fps" in sys.argv:
+	max_fps = int(sys.argv[sys.argv.index("--fps") + 1])
+if "--tick-rate" in sys.argv:
+	tick_rate = int(sys.argv[sys.argv.index("--tick-rate") + 1])
+
+# Show how long each part of the game takes from the start, F3 turns it on and off while playing
+profile = "--profile" in sys.argv
+
+# Time every level and save the results, e.g. "--bench --frames 600 --bench-out results.json"
+# Like headless runs, benchmarks start from an empty save and never write one
+run_bench = "--bench" in sys.argv
+bench_path = sys.argv[sys.argv.index("--bench-out") + 1] if "--bench-out" in sys.argv else "bench.json"
+
+# Record a run to a file, or play one back, e.g. "--record run.rec --seed 42" then "--replay run.rec"
+record_path = sys.argv[sys.argv.index("--record") + 1] if "--record" in sys.argv else None
+replay_path = sys.argv[sys.argv.index("--replay") + 1] if "--replay" in sys.argv else None
+record_seed = int(sys.argv[sys.argv.index("--seed") + 1]) if "--seed" in sys.argv else None
+
 # Kenney Audio Assets (https://kenney.nl/assets?q=audio)
 # Shapeforms Audio Assets (https://shapeforms.itch.io/shapeforms-audio-free-sfx)
 # Mixkit Audio Assets (https://mixkit.co/)
@@ -0,0 +1,81 @@
+"""
+-------------------------------------------------
+    Project: Sneaktime
+    Standard: 91906 (AS3.7)
+    School: Tauranga Boys' College
+    Author: Michael Ren
+    Date: 05 OCT 2021
+    Python: 3.9.6
+    License: MIT
+-------------------------------------------------
+"""
+
+import math
+
+# Uniform grid of the moving circles (enemies and the boss), rebuilt once per frame so
+# collision checks only look at the few entities near them instead of all of them.
+#
+# Each entity is stored in the cell its center is in. Queries look at every cell
+# within reach of the biggest circle, plus a margin for how far entities can move
+# between the rebuild and the query, so only the exact collision test uses the
+# current positions. Nothing is missed as long as the margin covers the furthest an
+# entity can move in one update (see GameManager and max_step).
+class SpatialHash:
+    def __init__(self, cell_size=128, margin=32):
+        self.cell_size = cell_size
+        self.margin = margin
+        self.cells = {}
+        self.entities = []
+        self.max_radius = 0
+
+    def get_cell(self, x, y):
+        return math.floor(x / self.cell_size), math.floor(y / self.cell_size)
+
+    # Entities need a collision_obj circle
+    def rebuild(self, entities):
+        self.cells = {}
+        self.entities = list(entities)
+        self.max_radius = 0
+        for i, e in enumerate(self.entities):
+            c = e.collision_obj
+            self.cells.setdefault(self.get_cell(c.pos.x, c.pos.y), []).append(i)
+            self.max_radius = max(self.max_radius, c.radius)
+
+    # Stop returning an entity (when it dies part way through a frame)
+    def remove(self, entity):
+        for i, e in enumerate(self.entities):
+            if e is entity:
+                self.entities[i] = None
+
+    def clear(self):
+        self.rebuild([])
+
+    # Entities that might overlap the rect (x, y, w, h), in the order they were added
+    def query_rect(self, rect):
+        x, y, w, h = rect
+        reach = self.max_radius + self.margin
+        col1, row1 = self.get_cell(x - reach, y - reach)
+        col2, row2 = self.get_cell(x + w + reach, y + h + reach)
+        found = []
+        for row in range(row1, row2 + 1):
+            for col in range(col1, col2 + 1):
+                found.extend(self.cells.get((col, row), ()))
+        found.sort()
+        return [self.entities[i] for i in found if self.entities[i] is not None]
+
+    # Indices of the entities that might be within radius of any of the points (an array
+    # of x, y rows), in the order they were added. Points in the same cell share a lookup.
+    def query_points(self, points, radius):
+        reach = radius + self.max_radius + self.margin
+        span = math.ceil(reach / self.cell_size)
+        found = set()
+        for col, row in set(map(tuple, (points // self.cell_size).astype(int).tolist())):
+            for r in range(row - span, row + span + 1):
+                for c in range(col - span, col + span + 1):
+                    found.update(self.cells.get((c, r), ()))
+        return [i for i in sorted(found) if self.entities[i] is not None]
+
+    # Entities that might overlap a circle
+    def nearby(self, circle):
+        r = circle.radius
+        return self.query_rect((circle.pos.x - r, circle.pos.y - r, r * 2, r * 2))
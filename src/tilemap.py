@@ -11,49 +11,79 @@
 -------------------------------------------------
 """
 
-import json, math
+import os, math
+import numpy as np
 import pygame as pg
+import mapcache
+import sdf
+import flowfield
 from collision import *
 from settings import *
 
 class TiledMap:
-    def __init__(self, game, path):
+    spawner_tiles = {
+        "player": 49,
+        "enemy": 50, 
+        "boss": 51, 
+        # Power ups
+        "disguise": 41,
+        "shotgun": 42, 
+        "armour": 43,
+        # Items
+        "key": 44,
+        # Traps
+        "laser_h": 33,
+        "laser_v": 34,
+        "ninja_star_h": 35,
+        "ninja_star_v": 36,
+        "camera_l": 37,
+        "camera_r": 38,
+        "camera_u": 39,
+        "camera_d": 40,
+    }
+    tracker_tiles = {
+        "tracker1": 57,
+    }
+
+    # The map data is built from plain Python and NumPy and can be built on any thread.
+    # The sprites and chunk surfaces use pygame, which has to stay on the main thread,
+    # so with load_surfaces=False they are left for load_surfaces() to do later.
+    def __init__(self, game, path, on_progress=None, load_surfaces=True):
         self.game = game
-        self.spawner_tiles = {
-            "player": 49,
-            "enemy": 50, 
-            "boss": 51, 
-            # Power ups
-            "disguise": 41,
-            "shotgun": 42, 
-            "armour": 43,
-            # Items
-            "key": 44,
-            # Traps
-            "laser_h": 33,
-            "laser_v": 34,
-            "ninja_star_h": 35,
-            "ninja_star_v": 36,
-            "camera_l": 37,
-            "camera_r": 38,
-            "camera_u": 39,
-            "camera_d": 40,
-        }
-        self.tracker_tiles = {
-            "tracker1": 57,
-        }
-
-        self.load_tilemap(path)
+        # Number of tiles along each side of a baked chunk surface
+        self.chunk_tiles = 8
+        # Size of the broad phase grid cells used by poly_collide
+        self.polygon_cell_size = 128
+        # Spacing of the distance field samples
+        self.field_size = 8
+
+        # Report the fraction of loading done after each step
+        steps = [
+            lambda: self.load_tilemap(path),
+            self.load_polygons,
+            self.load_tiles,
+            self.load_occupancy,
+            self.load_flow_field,
+            self.load_segments,
+            lambda: self.load_distance_fields(path),
+        ]
+        for i, step in enumerate(steps):
+            step()
+            if on_progress:
+                on_progress((i + 1) / len(steps))
+        if load_surfaces:
+            self.load_surfaces()
+
+    def load_surfaces(self):
         self.load_tileset()
-        self.load_polygons()
-        self.load_tiles()
+        self.bake_chunks()
 
+    # Maps are read from their compiled form, which is rebuilt whenever the JSON changes
     def load_tilemap(self, path):
-        f = open(rs_dir + path)
-        self.data = json.load(f)
+        self.data = mapcache.load(rs_dir + path, self.spawner_tiles, self.tracker_tiles)
 
     def load_tileset(self):
-        img = pg.image.load(self.game.get_themed_path("maps", "tilesheet.png")).convert_alpha()
+        img = self.game.load_image("maps", "tilesheet.png")
         img_width, img_height = img.get_size()
         tile_width, tile_height = self.data["tilewidth"], self.data["tileheight"]
         self.tileset = []
@@ -63,6 +93,8 @@ class TiledMap:
                 img_x = tile_x * tile_width
                 rect = (img_x, img_y, tile_width, tile_height)
                 self.tileset.append(img.subsurface(rect))
+        for tile in self.tiles:
+            tile["img"] = self.tileset[tile["tile_id"]-1]
 
     # All polygons must be convex
     def load_polygons(self):
@@ -74,71 +106,327 @@ class TiledMap:
                 for obj in layer["objects"]:
                     if "polygon" in obj:
                         points = []
-                        for p in obj["polygon"]:
-                            points.append(v(p["x"], p["y"]))
+                        vertices = obj["polygon"]
+                        for i in range(0, len(vertices), 2):
+                            points.append(v(vertices[i], vertices[i+1]))
                         polys.append(Poly(v(obj["x"], obj["y"]), points))
                 if polys:
                     self.polygons[layer["name"].lower()] = polys
 
+        # Broad phase, bucket the bounding box of every polygon into a uniform grid per layer
+        self.polygon_layers = {}
+        self.layer_selections = {}
+        size = self.polygon_cell_size
+        for layer_name, polys in self.polygons.items():
+            bounds = []
+            grid = {}
+            for i, p in enumerate(polys):
+                (x1, y1), _, _, (x2, y2) = p.aabb
+                bounds.append((x1, y1, x2, y2))
+                for cy in range(math.floor(y1 / size), math.floor(y2 / size) + 1):
+                    for cx in range(math.floor(x1 / size), math.floor(x2 / size) + 1):
+                        grid.setdefault((cx, cy), []).append(i)
+            self.polygon_layers[layer_name] = {
+                "polys": polys,
+                "bounds": bounds,
+                "grid": grid,
+            }
+
+    # Find the polygon layers to test against, memoised per combination of layer names
+    def select_layers(self, target_layer_name=None, exclude_layer_name=None):
+        key = (target_layer_name, exclude_layer_name)
+        layers = self.layer_selections.get(key)
+        if layers is None:
+            # Convert to lower case
+            if target_layer_name:
+                target_layer_name = target_layer_name.lower()
+            if exclude_layer_name:
+                exclude_layer_name = exclude_layer_name.lower()
+            layers = []
+            for layer_name, layer in self.polygon_layers.items():
+                if (not target_layer_name or target_layer_name == layer_name) and (not exclude_layer_name or exclude_layer_name != layer_name):
+                    layers.append(layer)
+            self.layer_selections[key] = layers
+        return layers
+
+    # Find the polygons in a layer whose bounding boxes overlap the given box, in map order
+    def query_polygons(self, layer, x1, y1, x2, y2):
+        size = self.polygon_cell_size
+        grid = layer["grid"]
+        candidates = set()
+        for cy in range(math.floor(y1 / size), math.floor(y2 / size) + 1):
+            for cx in range(math.floor(x1 / size), math.floor(x2 / size) + 1):
+                cell = grid.get((cx, cy))
+                if cell:
+                    candidates.update(cell)
+        results = []
+        bounds = layer["bounds"]
+        for i in sorted(candidates):
+            bx1, by1, bx2, by2 = bounds[i]
+            if bx1 <= x2 and x1 <= bx2 and by1 <= y2 and y1 <= by2:
+                results.append(layer["polys"][i])
+        return results
+
     def load_tiles(self):
-        self.spawners = {} # Spawn points
-        self.trackers = {} # Invisible points for the camera to track
-        for k in self.spawner_tiles:
-            self.spawners[k] = []
-        for k in self.tracker_tiles:
-            self.trackers[k] = []
+        # Spawn points and invisible points for the camera to track are resolved when the map is compiled
+        self.spawners = self.data["spawners"]
+        self.trackers = self.data["trackers"]
 
         self.tiles = []
+        # Per layer lookup of visible tiles keyed by tile coordinates, in layer order
+        self.tile_grid = []
         self.tilewidth = self.data["tilewidth"]
         self.tileheight = self.data["tileheight"]
         for layer in self.data["layers"]:
-            if layer["type"] == "tilelayer":
+            # Spawner tile and camera tracker layers are hidden
+            if layer["type"] == "tilelayer" and layer["visible"]:
+                grid = {}
+                self.tile_grid.append((layer["name"], grid))
                 for chunk in layer["chunks"]:
                     cw = chunk["width"]
-                    ch = chunk["height"]
                     cx = chunk["x"]
                     cy = chunk["y"]
-                    tx = 0
-                    ty = 0
-                    for tile_id in chunk["data"]:
-                        render_x = (cx + tx) * self.tilewidth 
-                        render_y = (cy + ty) * self.tileheight
-                        # means there is no tile
+                    for i, tile_id in enumerate(chunk["data"]):
+                        # 0 means there is no tile
                         if tile_id != 0:
-                            rect = (render_x, render_y, self.tilewidth, self.tileheight)
-                            if layer["visible"]:
-                                self.tiles.append({
-                                    "img": self.tileset[tile_id-1], 
-                                    "rect": rect,
-                                    "tile_id": tile_id,
-                                    "layer_name": layer["name"],
-                                })
-                            else:
-                                # Spawner tile and camera tracker layers must be hidden
-                                for k, v in self.spawner_tiles.items():
-                                    if tile_id == v:
-                                        self.spawners[k].append({
-                                            "tile_id": tile_id,
-                                            "rect": rect,
-                                        })
-                                for k, v in self.tracker_tiles.items():
-                                    if tile_id == v:
-                                        self.trackers[k].append({
-                                            "spawner_id": None,
-                                            "rect": rect,
-                                        })
-                        tx += 1
-                        if tx == cw:
-                            tx = 0
-                            ty += 1
-
-        # Find spawner tags that're at the same coordinate as the tracker tags
-        for k1, v1 in self.trackers.items():
-            for tracker in v1:
-                for k2, v2 in self.spawners.items():
-                    for spawner in v2:
-                        if tracker["rect"] == spawner["rect"]:
-                            tracker["spawner_id"] = spawner["tile_id"]
+                            ty, tx = divmod(i, cw)
+                            render_x = (cx + tx) * self.tilewidth 
+                            render_y = (cy + ty) * self.tileheight
+                            tile = {
+                                "img": None, # Set by load_tileset
+                                "rect": (render_x, render_y, self.tilewidth, self.tileheight),
+                                "tile_id": tile_id,
+                                "layer_name": layer["name"],
+                            }
+                            self.tiles.append(tile)
+                            grid[(cx + tx, cy + ty)] = tile
+
+    # Rasterize every collision layer into a grid of blocked cells, used for line of sight queries
+    def load_occupancy(self):
+        size = self.occupancy_size = self.tilewidth // 4
+        bounds = [b for layer in self.polygon_layers.values() for b in layer["bounds"]]
+        if not bounds:
+            bounds = [(0, 0, 0, 0)]
+        self.occupancy_x = math.floor(min(b[0] for b in bounds) / size) * size
+        self.occupancy_y = math.floor(min(b[1] for b in bounds) / size) * size
+        self.occupancy_cols = math.ceil((max(b[2] for b in bounds) - self.occupancy_x) / size) + 1
+        self.occupancy_rows = math.ceil((max(b[3] for b in bounds) - self.occupancy_y) / size) + 1
+        self.occupancy = bytearray(self.occupancy_cols * self.occupancy_rows)
+
+        for layer in self.polygon_layers.values():
+            for p, (x1, y1, x2, y2) in zip(layer["polys"], layer["bounds"]):
+                points = [(q.x, q.y) for q in p.points]
+                edges = list(zip(points, points[1:] + points[:1]))
+                col1 = math.floor((x1 - self.occupancy_x) / size)
+                col2 = math.floor((x2 - self.occupancy_x) / size)
+                row1 = math.floor((y1 - self.occupancy_y) / size)
+                row2 = math.floor((y2 - self.occupancy_y) / size)
+                for row in range(row1, row2 + 1):
+                    cy = self.occupancy_y + (row + 0.5) * size
+                    for col in range(col1, col2 + 1):
+                        cx = self.occupancy_x + (col + 0.5) * size
+                        # A cell is blocked if its center is inside the (convex) polygon
+                        sides = [(bx - ax) * (cy - ay) - (by - ay) * (cx - ax) for (ax, ay), (bx, by) in edges]
+                        if all(s >= 0 for s in sides) or all(s <= 0 for s in sides):
+                            self.occupancy[row * self.occupancy_cols + col] = 1
+
+    def is_blocked(self, col, row):
+        if 0 <= col < self.occupancy_cols and 0 <= row < self.occupancy_rows:
+            return self.occupancy[row * self.occupancy_cols + col]
+        return 0
+
+    # The shared path enemies follow to the player, built with the rest of the map
+    # (on the loader thread) so starting the level doesn't have to
+    def load_flow_field(self):
+        self.flow_field = flowfield.FlowField(self)
+
+    # Walk every grid cell the line passes through (DDA)
+    def trace(self, x1, y1, x2, y2):
+        size = self.occupancy_size
+        gx1 = (x1 - self.occupancy_x) / size
+        gy1 = (y1 - self.occupancy_y) / size
+        gx2 = (x2 - self.occupancy_x) / size
+        gy2 = (y2 - self.occupancy_y) / size
+        col, row = math.floor(gx1), math.floor(gy1)
+        end_col, end_row = math.floor(gx2), math.floor(gy2)
+        dx = gx2 - gx1
+        dy = gy2 - gy1
+        step_x = 1 if dx > 0 else -1
+        step_y = 1 if dy > 0 else -1
+        # Distance along the line (0 - 1) between crossing vertical and horizontal cell edges
+        delta_x = abs(1 / dx) if dx else math.inf
+        delta_y = abs(1 / dy) if dy else math.inf
+        # Distance along the line to the first vertical and horizontal cell edges
+        max_x = ((col + 1 - gx1) if dx > 0 else (gx1 - col)) * delta_x if dx else math.inf
+        max_y = ((row + 1 - gy1) if dy > 0 else (gy1 - row)) * delta_y if dy else math.inf
+
+        # Stop at the end cell, a corner step moves both ways at once so counting steps would overshoot.
+        # The count is only a limit in case rounding ever steps around the end cell.
+        for _ in range(abs(end_col - col) + abs(end_row - row) + 1):
+            if self.is_blocked(col, row):
+                return False
+            if (col, row) == (end_col, end_row):
+                break
+            if max_x < max_y:
+                col += step_x
+                max_x += delta_x
+            elif max_y < max_x:
+                row += step_y
+                max_y += delta_y
+            else:
+                # The line passes exactly through a corner, check both neighbours as well
+                if self.is_blocked(col + step_x, row) or self.is_blocked(col, row + step_y):
+                    return False
+                col += step_x
+                row += step_y
+                max_x += delta_x
+                max_y += delta_y
+        return True
+
+    # Check if a strip (radius wide on each side) between two points is clear of walls
+    def line_of_sight(self, start, end, radius=0):
+        x1, y1 = start
+        x2, y2 = end
+        dx = x2 - x1
+        dy = y2 - y1
+        length = math.hypot(dx, dy)
+        if not radius or not length:
+            return self.trace(x1, y1, x2, y2)
+        # Trace parallel lines across the strip that are never more than one cell apart,
+        # so every cell the strip touches is crossed by at least one of them
+        nx = -dy / length
+        ny = dx / length
+        n = math.ceil(2 * radius / self.occupancy_size) + 1
+        for i in range(n):
+            offset = -radius + 2 * radius * i / (n - 1)
+            if not self.trace(x1 + nx*offset, y1 + ny*offset, x2 + nx*offset, y2 + ny*offset):
+                return False
+        return True
+
+    # Extract the edges of every wall polygon and bucket them into a grid, used for visibility
+    def load_segments(self):
+        size = self.polygon_cell_size
+        self.wall_segments = []
+        self.segment_grid = {}
+        # The exit isn't a wall, it can be seen through
+        for layer in self.select_layers(exclude_layer_name="exit"):
+            for p in layer["polys"]:
+                points = [(q.x, q.y) for q in p.points]
+                cx = sum(x for x, _ in points) / len(points)
+                cy = sum(y for _, y in points) / len(points)
+                for (ax, ay), (bx, by) in zip(points, points[1:] + points[:1]):
+                    ex = bx - ax
+                    ey = by - ay
+                    length = math.hypot(ex, ey)
+                    if not length:
+                        continue
+                    # Outward facing normal
+                    nx = ey / length
+                    ny = -ex / length
+                    if (ax - cx) * nx + (ay - cy) * ny < 0:
+                        nx, ny = -nx, -ny
+                    i = len(self.wall_segments)
+                    self.wall_segments.append((ax, ay, ex, ey, nx, ny))
+                    for gy in range(math.floor(min(ay, by) / size), math.floor(max(ay, by) / size) + 1):
+                        for gx in range(math.floor(min(ax, bx) / size), math.floor(max(ax, bx) / size) + 1):
+                            self.segment_grid.setdefault((gx, gy), []).append(i)
+
+    # Signed distance fields of the walls and of the exit, which players can walk into
+    def load_distance_fields(self, path):
+        name = os.path.splitext(os.path.basename(path))[0]
+        bounds = [b for layer in self.polygon_layers.values() for b in layer["bounds"]] or [(0, 0, 0, 0)]
+        bounds = (min(b[0] for b in bounds), min(b[1] for b in bounds), max(b[2] for b in bounds), max(b[3] for b in bounds))
+        walls = [[(q.x, q.y) for q in p.points] for layer in self.select_layers(exclude_layer_name="exit") for p in layer["polys"]]
+        self.wall_field = sdf.load(name + ".walls", walls, bounds, self.field_size)
+        self.exit_field = None
+        exits = [[(q.x, q.y) for q in p.points] for layer in self.select_layers(target_layer_name="exit") for p in layer["polys"]]
+        if exits:
+            self.exit_field = sdf.load(name + ".exit", exits, bounds, self.field_size)
+
+    # Distance from a point to the nearest wall and the direction away from it
+    def get_distance(self, x, y, include_exit=True):
+        d, gx, gy = self.wall_field.sample(x, y)
+        if include_exit and self.exit_field:
+            e = self.exit_field.sample(x, y)
+            if e[0] < d:
+                d, gx, gy = e
+        return d, gx, gy
+
+    def get_distances(self, xs, ys, include_exit=True):
+        d = self.wall_field.sample_many(xs, ys)
+        if include_exit and self.exit_field:
+            d = np.minimum(d, self.exit_field.sample_many(xs, ys))
+        return d
+
+    # Same result as poly_collide(circle, capture_all=True) but looked up in the distance fields
+    def circle_collide(self, circle, include_exit=True):
+        x, y, radius = circle.pos.x, circle.pos.y, circle.radius
+        push_x = push_y = 0
+        # Push out a few times so circles in corners end up clear of both walls
+        for _ in range(3):
+            d, gx, gy = self.get_distance(x + push_x, y + push_y, include_exit)
+            length = math.hypot(gx, gy)
+            if d >= radius or not length:
+                break
+            push_x += gx / length * (radius - d)
+            push_y += gy / length * (radius - d)
+        if push_x or push_y:
+            # Overlap vectors point into the wall
+            return [Vector(-push_x, -push_y)]
+        return []
+
+    # Move circles from start to end, stepping by their distance to the walls so they can't
+    # skip through thin walls. Returns which ones hit something and where they stopped,
+    # circles still grazing a wall after max_steps stop where they got to.
+    def sweep_circles(self, start, end, radius, include_exit=True, max_steps=32):
+        delta = end - start
+        length = np.hypot(delta[:, 0], delta[:, 1])
+        t = np.zeros(len(start))
+        pos = start.copy()
+        hit = np.zeros(len(start), bool)
+        active = np.ones(len(start), bool)
+        for _ in range(max_steps):
+            d = self.get_distances(pos[:, 0], pos[:, 1], include_exit) - radius
+            hit |= active & (d <= 0)
+            active &= (d > 0) & (t < length)
+            if not active.any():
+                break
+            t = np.where(active, np.minimum(t + np.maximum(d, 1), length), t)
+            frac = np.divide(t, length, out=np.ones_like(t), where=length > 0)
+            pos = np.where(active[:, None], start + delta * frac[:, None], pos)
+        return hit, pos
+
+    # Find the wall segments that are in grid cells overlapping the given box
+    def query_segments(self, x1, y1, x2, y2):
+        size = self.polygon_cell_size
+        candidates = set()
+        for gy in range(math.floor(y1 / size), math.floor(y2 / size) + 1):
+            for gx in range(math.floor(x1 / size), math.floor(x2 / size) + 1):
+                cell = self.segment_grid.get((gx, gy))
+                if cell:
+                    candidates.update(cell)
+        return [self.wall_segments[i] for i in sorted(candidates)]
+
+    # Pre-composite the visible tile layers into fixed-size chunk surfaces,
+    # so drawing the map only blits the few chunks that are on screen
+    def bake_chunks(self):
+        self.chunk_width = self.tilewidth * self.chunk_tiles
+        self.chunk_height = self.tileheight * self.chunk_tiles
+        self.chunks = {}
+        background = self.game.get_color("background")
+        # Tiles are appended in layer order, so blitting them in sequence keeps the layering
+        for t in self.tiles:
+            x, y, w, h = t["rect"]
+            for cy in range(math.floor(y / self.chunk_height), math.floor((y + h - 1) / self.chunk_height) + 1):
+                for cx in range(math.floor(x / self.chunk_width), math.floor((x + w - 1) / self.chunk_width) + 1):
+                    chunk = self.chunks.get((cx, cy))
+                    if not chunk:
+                        # The map is always drawn first onto a background filled screen,
+                        # so chunks can be opaque surfaces filled with the background color
+                        chunk = pg.Surface((self.chunk_width, self.chunk_height)).convert()
+                        chunk.fill(background)
+                        self.chunks[(cx, cy)] = chunk
+                    chunk.blit(t["img"], (x - cx * self.chunk_width, y - cy * self.chunk_height))
 
     def rect_collide(self, rect, target_layer_name=None, exclude_layer_name=None):
         x1 = rect[0]
@@ -172,31 +460,37 @@ class TiledMap:
         # Must capture all collisions for r.overlap_v to work, 
         # otherwise 'a' will tunnel into 'b' while responding collision with 'c'
         all_collisions = []
-        # Convert to lower case
-        if target_layer_name:
-            target_layer_name = target_layer_name.lower()
-        if exclude_layer_name:
-            exclude_layer_name = exclude_layer_name.lower()
-        for layer_name, items in self.polygons.items():
-            if (not target_layer_name or target_layer_name == layer_name) and (not exclude_layer_name or exclude_layer_name != layer_name):
-                for p2 in items:
-                    # Collision responses are only supported for convex polygons
-                    r = Response()
-                    if collide(p1, p2, response=r):
-                        # Calculate the collision angle
-                        # angle = round(math.atan2(*r.overlap_n)*180/math.pi)
-                        if capture_all:
-                            all_collisions.append(r.overlap_v)
-                        else:
-                            return r.overlap_v
+        if isinstance(p1, Circle):
+            x, y, radius = p1.pos.x, p1.pos.y, p1.radius
+            x1, y1, x2, y2 = x - radius, y - radius, x + radius, y + radius
+        else:
+            (x1, y1), _, _, (x2, y2) = p1.aabb
+        r = Response()
+        for layer in self.select_layers(target_layer_name, exclude_layer_name):
+            # Narrow phase only runs against polygons near the shape
+            for p2 in self.query_polygons(layer, x1, y1, x2, y2):
+                # Collision responses are only supported for convex polygons
+                if collide(p1, p2, response=r.reset()):
+                    # Calculate the collision angle
+                    # angle = round(math.atan2(*r.overlap_n)*180/math.pi)
+                    if capture_all:
+                        all_collisions.append(r.overlap_v)
+                    else:
+                        return r.overlap_v
         return all_collisions
 
     def get_tile(self, x1, y1, target_layer_name=None, capture_all=False):
         all_tiles = []
-        for t in self.tiles:
-            if not target_layer_name or target_layer_name == t["layer_name"]:
-                x2, y2, w2, h2 = t["rect"]
-                if (x1 == x2 and y1 == y2) or ((x1 > x2 and x1 < x2 + w2) and (y1 > y2 and y1 < y2 + h2)):
+        tx, rx = divmod(x1, self.tilewidth)
+        ty, ry = divmod(y1, self.tileheight)
+        # Points on a tile's edge only count if they are exactly on its top left corner
+        if (rx == 0) != (ry == 0):
+            return all_tiles
+        key = (int(tx), int(ty))
+        for layer_name, grid in self.tile_grid:
+            if not target_layer_name or target_layer_name == layer_name:
+                t = grid.get(key)
+                if t:
                     if capture_all:
                         all_tiles.append(t)
                     else:
@@ -204,12 +498,15 @@ class TiledMap:
         return all_tiles
 
     def draw(self, screen):
-        for t in self.tiles:
-            rect = t["rect"]
-            # Only render tile if it's within the viewport
-            if (rect[0] + rect[2] > self.game.camera.pos.x and rect[0] < self.game.camera.pos.x + WORLD_SIZE[0]) \
-                and (rect[1] + rect[3] > self.game.camera.pos.y and rect[1] < self.game.camera.pos.y + WORLD_SIZE[1]):
-                screen.blit(t["img"], rect)
-
-
-
+        # Only render chunks that overlap the viewport
+        camera = self.game.camera
+        sw, sh = screen.get_size()
+        x1 = math.floor(camera.offset.x / self.chunk_width)
+        y1 = math.floor(camera.offset.y / self.chunk_height)
+        x2 = math.floor((camera.offset.x + sw) / self.chunk_width)
+        y2 = math.floor((camera.offset.y + sh) / self.chunk_height)
+        for cy in range(y1, y2 + 1):
+            for cx in range(x1, x2 + 1):
+                chunk = self.chunks.get((cx, cy))
+                if chunk:
+                    screen.blit(chunk, (cx * self.chunk_width - camera.offset.x, cy * self.chunk_height - camera.offset.y))
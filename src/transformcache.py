@@ -0,0 +1,75 @@
+"""
+-------------------------------------------------
+    Project: Sneaktime
+    Standard: 91906 (AS3.7)
+    School: Tauranga Boys' College
+    Author: Michael Ren
+    Date: 05 OCT 2021
+    Python: 3.9.6
+    License: MIT
+-------------------------------------------------
+"""
+
+from collections import OrderedDict
+import pygame as pg
+
+# Rotated and scaled copies of sprites, shared by the whole game. Angles are
+# rounded to a fixed number of steps so a spinning sprite only ever needs a
+# small set of images, the least recently used ones are dropped once the
+# cache grows past its memory limit.
+class TransformCache:
+    def __init__(self, angle_steps=120, max_bytes=64*1024*1024):
+        self.angle_steps = angle_steps
+        self.max_bytes = max_bytes
+        self.surfaces = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def quantize(self, angle):
+        return round(angle % 360 / 360 * self.angle_steps) % self.angle_steps
+
+    def get(self, key):
+        surface = self.surfaces.get(key)
+        if surface is not None:
+            self.surfaces.move_to_end(key)
+            self.hits += 1
+        return surface
+
+    def add(self, key, surface):
+        self.misses += 1
+        self.surfaces[key] = surface
+        self.bytes += surface.get_width() * surface.get_height() * surface.get_bytesize()
+        while self.bytes > self.max_bytes and len(self.surfaces) > 1:
+            _, old = self.surfaces.popitem(last=False)
+            self.bytes -= old.get_width() * old.get_height() * old.get_bytesize()
+        return surface
+
+    # The source surface is part of the key so reloading a sprite never returns stale images
+    def rotate(self, surface, angle):
+        step = self.quantize(angle)
+        key = (surface, step, None)
+        rotated = self.get(key)
+        if rotated is None:
+            rotated = self.add(key, pg.transform.rotate(surface, step * 360 / self.angle_steps))
+        return rotated
+
+    def scale(self, surface, size):
+        size = (int(size[0]), int(size[1]))
+        key = (surface, 0, size)
+        scaled = self.get(key)
+        if scaled is None:
+            scaled = self.add(key, pg.transform.scale(surface, size))
+        return scaled
+
+    # Build every rotation of a sprite that's known to spin, so it never rotates while playing
+    def prewarm_rotations(self, surface):
+        for step in range(self.angle_steps):
+            self.rotate(surface, step * 360 / self.angle_steps)
+
+    def clear(self):
+        self.surfaces.clear()
+        self.bytes = 0
+
+
+cache = TransformCache()
@@ -11,12 +11,18 @@
 -------------------------------------------------
 """
 
-import random, math
+import math
 import pygame as pg
+import visibility
+import transformcache
+import rng
 from collision import *
 from settings import *
 from scripts import *
 
+# Traps draw their random numbers from their own stream
+trap_random = rng.get("trap")
+
 class TrapManager:
     def __init__(self, game):
         self.game = game
@@ -47,9 +53,9 @@ class LaserTrap:
         self.end_pos = pg.Vector2()
         self.direction = direction
         self.activated = False
-        self.delay = random.randint(1,3)
+        self.delay = trap_random.randint(1,3)
         self.delay_timer = self.delay
-        self.duration = random.randint(1,3)
+        self.duration = trap_random.randint(1,3)
         self.duration_timer = self.duration
 
         self.get_end_pos()
@@ -105,7 +111,7 @@ class LaserTrap:
 
     def draw(self, screen):
         if self.activated:
-            pg.draw.line(screen, self.game.get_color("background"), self.pos, self.end_pos, 3)
+            pg.draw.line(screen, self.game.get_color("background"), self.game.camera.apply(self.pos), self.game.camera.apply(self.end_pos), 3)
 
 
 class NinjaStarTrap(LaserTrap):
@@ -128,12 +134,13 @@ class NinjaStarTrap(LaserTrap):
 
         self.load_sprite()
         self.img_w, self.img_h = self.img.get_size()
+        transformcache.cache.prewarm_rotations(self.img)
 
         v = Vector
         self.collision_obj = Circle(v(*self.pos), self.img_w/2)
 
     def load_sprite(self):
-        self.img = pg.image.load(self.game.get_themed_path("traps", "ninja_star.png")).convert_alpha()
+        self.img = self.game.load_image("traps", "ninja_star.png")
 
     def update(self, dt):
         # Calculate displacement based on sin(movement_counter)
@@ -166,8 +173,8 @@ class NinjaStarTrap(LaserTrap):
             self.play_sound = True
 
     def draw(self, screen):
-        rotated_img = pg.transform.rotate(self.img, self.angle)
-        new_rect = rotated_img.get_rect(center=self.render_pos)
+        rotated_img = transformcache.cache.rotate(self.img, self.angle)
+        new_rect = rotated_img.get_rect(center=self.game.camera.apply(self.render_pos))
         screen.blit(rotated_img, new_rect)
 
 
@@ -208,6 +215,13 @@ class CameraTrap:
             v(-150, 300), 
         ]
         self.FOV_obj = Poly(v(*self.pos), self.FOV_points, self.angle)
+        self.visibility = visibility.VisibilityCache()
+        self.update_FOV()
+
+    # Clip the field of view against the walls, the camera never moves so only turning recomputes it
+    def update_FOV(self):
+        points = [(p.x, p.y) for p in self.FOV_obj.points]
+        self.FOV_polygon = self.visibility.update(self.game.level_manager.current_map(), self.pos, self.FOV_obj.angle, points)
 
     def update(self, dt):
         # Calculate displacement based on sin(movement_counter)
@@ -216,12 +230,15 @@ class CameraTrap:
         
         # Set the render position to be origin + displacement
         self.FOV_obj.angle = math.radians(self.angle + self.displacement)
+        self.update_FOV()
 
-        if collide(self.FOV_obj, self.game.player.collision_obj):
+        player = self.game.player
+        if visibility.circle_overlaps(self.FOV_polygon, *player.c_pos, player.collision_obj.radius):
             if not self.game.player.inventory.has_powerup("disguise"):
                 self.game.level_manager.lockdown = True
 
     def draw(self, screen):
-        # Draw FOV area using EnemyManager's transparent surface
-        pg.draw.polygon(self.game.enemy_manager.transparent_surface, (*self.game.get_color("background"), 32), self.FOV_obj.points)
+        # Draw FOV area on the same overlay layer as the enemies
+        if len(self.FOV_polygon) > 2:
+            self.game.overlay.polygon("fov", (*self.game.get_color("background"), 32), self.FOV_polygon)
 
@@ -36,7 +36,7 @@ class TutorialManager:
         self.complete_message = None
 
     def update(self, dt):
-        keys = pg.key.get_pressed()
+        keys = self.game.input.get_pressed()
         
         # Tutorial
         if not self.game.player.completed_tutorial:
@@ -87,7 +87,7 @@ class TutorialManager:
             change = (math.sin(self.tracker_counter) + 1) * 10
             _map = self.game.level_manager.current_map()
             pos = pg.Vector2(tracker["rect"][0] + _map.tilewidth/2, tracker["rect"][1] + _map.tileheight/2)
-            pg.draw.circle(screen, self.game.get_color("primary"), pos, self.tracker_radius + change, 2)
+            pg.draw.circle(screen, self.game.get_color("primary"), self.game.camera.apply(pos), self.tracker_radius + change, 2)
 
 
 
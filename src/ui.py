@@ -13,9 +13,53 @@
 
 import pygame as pg
 import theme
+import assets
 from settings import *
 from scripts import *
 
+# Roboto Mono is monospaced, so each character is rendered once per size and
+# color and lines of text are put together from those glyphs
+class GlyphAtlas:
+    def __init__(self, size, color):
+        self.font = assets.manager.font(rs_dir + "/fonts/RobotoMonoMedium.ttf", size)
+        self.color = color
+        self.glyphs = {}
+        self.lines = {}
+        self.cw, self.ch = self.get_glyph("0").get_size()
+
+    def get_glyph(self, char):
+        glyph = self.glyphs.get(char)
+        if glyph is None:
+            glyph = self.font.render(char, True, self.color)
+            self.glyphs[char] = glyph
+        return glyph
+
+    # Glyphs can slightly overlap their neighbours, keep the strongest pixel of both
+    def blit_glyph(self, surface, char, index):
+        surface.blit(self.get_glyph(char), (self.cw * index, 0), special_flags=pg.BLEND_RGBA_MAX)
+
+    def new_line(self, length):
+        return pg.Surface((self.cw * length, self.ch), pg.SRCALPHA)
+
+    # Strings that never change are only put together once
+    def render(self, text):
+        line = self.lines.get(text)
+        if line is None:
+            line = self.new_line(len(text))
+            for i, char in enumerate(text):
+                self.blit_glyph(line, char, i)
+            self.lines[text] = line
+        return line
+
+glyph_atlases = {}
+
+def get_glyph_atlas(size, color):
+    key = (size, tuple(color))
+    if key not in glyph_atlases:
+        glyph_atlases[key] = GlyphAtlas(size, color)
+    return glyph_atlases[key]
+
+
 class Text:
     def __init__(self, x, y, text, color, interval, size=16, direction=1, typing_effect=True, delay=0):
         self.pos = pg.Vector2(x, y)
@@ -26,7 +70,7 @@ class Text:
         self.timer = interval
         self.direction = direction
         self.index = 0 if direction == 1 else len(self.text) - 1
-        self.font = pg.font.Font(rs_dir + "/fonts/RobotoMonoMedium.ttf", size)
+        self.glyphs = get_glyph_atlas(size, color)
         self.focus = True
         self.cursor = False
         self.cursor_timer = 0.4
@@ -35,8 +79,18 @@ class Text:
             self.index = len(self.text)
             self.focus = False
 
-        _, _, self.cw, self.ch = self.font.render("0", True, self.color).get_rect()
-        self.text_obj = self.font.render(self.text[:self.index], True, self.color)
+        self.cw, self.ch = self.glyphs.cw, self.glyphs.ch
+        # The whole line is allocated up front and characters are added to it as they're typed,
+        # text_obj is the part of it that has been typed so far
+        self.line = self.glyphs.new_line(len(self.text))
+        self.rendered = 0
+        self.set_text_obj()
+
+    def set_text_obj(self):
+        while self.rendered < self.index:
+            self.glyphs.blit_glyph(self.line, self.text[self.rendered], self.rendered)
+            self.rendered += 1
+        self.text_obj = self.line.subsurface((0, 0, self.cw * self.index, self.ch))
 
     def update(self, dt):
         typing = False
@@ -52,7 +106,7 @@ class Text:
                         sound_effects["click"].play()
                     self.index += self.direction
                     self.timer = self.interval
-                    self.text_obj = self.font.render(self.text[:self.index], True, self.color)
+                    self.set_text_obj()
                     # Show cursor while typing
                     self.cursor = True
                     typing = True
@@ -103,7 +157,7 @@ class SplashScreen:
                 self.heading.focus = False
 
         if self.show_subheading and self.subheading.index == len(self.subheading.text):
-            keys = pg.key.get_pressed()
+            keys = self.game.input.get_pressed()
             if keys[pg.K_SPACE]:
                 # Load from any previous states or continue to the story screen
                 if not self.game.load():
@@ -140,7 +194,7 @@ class StoryScreen:
         self.delay = 1
 
     def update(self, dt):
-        keys = pg.key.get_pressed()
+        keys = self.game.input.get_pressed()
         # Speed up text
         if keys[pg.K_SPACE]: self.game.speed = 4
         else: self.game.speed = 1
@@ -175,12 +229,12 @@ class StoryScreen:
 class SelectScreen:
     def __init__(self, game, typing_effect=True):
         self.game = game
-        self.button_img = pg.image.load(rs_dir + "/button.png").convert_alpha()
-        self.button_pressed_img = pg.image.load(rs_dir + "/button_pressed.png").convert_alpha()
+        self.button_img = assets.manager.image(rs_dir + "/button.png")
+        self.button_pressed_img = assets.manager.image(rs_dir + "/button_pressed.png")
         self.heading = Text(0, 0, 'Select Level:', self.game.get_color("primary"), 0.05, delay=2, typing_effect=typing_effect)
         self.numbers = []
-        self.font = pg.font.Font(rs_dir + "/fonts/RobotoMonoMedium.ttf", 16)
-        _, _, self.cw, self.ch = self.font.render("0", True, (0, 0, 0)).get_rect()
+        glyphs = get_glyph_atlas(16, (0, 0, 0))
+        self.cw, self.ch = glyphs.cw, glyphs.ch
         self.button_width = 100
         self.button_height = 100
         self.block_width = self.button_width * 4
@@ -199,7 +253,7 @@ class SelectScreen:
                     self.visible_buttons += 1
                     self.button_timer = 0.05
             else:
-                keys = pg.key.get_pressed()
+                keys = self.game.input.get_pressed()
                 if keys[pg.K_LEFT]:
                     if not self.key_down and self.selected_button > 0:
                         self.selected_button -= 1
@@ -265,7 +319,7 @@ class SelectScreen:
                     color = (255, 255, 255)
                     stroke = 0
                 # Draw rect and create text object
-                obj = self.font.render(str(i), True, color)
+                obj = get_glyph_atlas(16, color).render(str(i))
                 if self.selected_button == i:
                     gap = 10
                 pg.draw.rect(screen, bg_color, (pos.x + gap, pos.y + gap, self.button_width - 2*gap, self.button_height - 2*gap), stroke, 20, 20, 20, 20)
@@ -337,10 +391,17 @@ class LevelScreen:
         self.delay = 4
         self.game.camera.reset()
 
+    def loading_progress(self):
+        loader = self.game.level_manager.loader
+        if loader:
+            return loader.progress
+        return 1
+
     def update(self, dt):
         if self.text.index == len(self.text.text):
             self.delay -= dt
-            if self.delay < 0:
+            # Only start the level after the map has finished loading in the background
+            if self.delay < 0 and self.loading_progress() == 1:
                 self.game.mode = "main"
                 self.game.level_manager.load_level() # Load level
                 self.game.camera.shake(200)
@@ -353,6 +414,17 @@ class LevelScreen:
         self.text.pos = pg.Vector2(x, y)
         self.text.draw(screen)
 
+        # Draw loading progress bar
+        ww, _ = self.game.window.get_size()
+        bar_width = 200
+        rect = ((ww - bar_width) / 2, y + self.text.ch + 20, bar_width * self.loading_progress(), 4)
+        pg.draw.rect(screen, self.game.get_color("primary"), rect,
+            border_top_left_radius=5,
+            border_top_right_radius=5,
+            border_bottom_left_radius=5,
+            border_bottom_right_radius=5
+        )
+
 
 class InterfaceManager:
     def __init__(self, game):
@@ -418,12 +490,12 @@ class PopUpMessage:
             if self.render_height < 0:
                 self.complete = True
         _, wh = self.game.window.get_size()
-        self.text.pos.x = self.game.camera.pos.x + self.margin + 4
-        self.text.pos.y = self.game.camera.pos.y + wh - self.render_height + self.margin
+        self.text.pos.x = self.margin + 4
+        self.text.pos.y = wh - self.render_height + self.margin
 
     def draw(self, screen):
         ww, wh = self.game.window.get_size()
-        pg.draw.rect(screen, self.game.get_color("primary"), (self.game.camera.pos.x, self.game.camera.pos.y + wh - self.render_height, ww, self.render_height + 5))
+        pg.draw.rect(screen, self.game.get_color("primary"), (0, wh - self.render_height, ww, self.render_height + 5))
         self.text.draw(screen)
 
 
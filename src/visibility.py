@@ -0,0 +1,206 @@
+"""
+-------------------------------------------------
+    Project: Sneaktime
+    Standard: 91906 (AS3.7)
+    School: Tauranga Boys' College
+    Author: Michael Ren
+    Date: 05 OCT 2021
+    Python: 3.9.6
+    License: MIT
+-------------------------------------------------
+"""
+
+import math
+
+# Walls closer to facing away from the origin than this are skipped
+EPSILON = 0.0001
+
+# Angle of an endpoint relative to the origin. Points straight to the left of the origin
+# are at the cut where the angles wrap around, they take the side of the other endpoint.
+def get_angle(x, y, other_y):
+    if y == 0 and x < 0:
+        return -math.pi if other_y < 0 else math.pi
+    return math.atan2(y, x)
+
+# Adds the events where a segment (relative to the origin) starts and stops covering
+# directions, in the order the sweep passes them
+def add_segment(events, segments, ax, ay, bx, by):
+    a = get_angle(ax, ay, by)
+    b = get_angle(bx, by, ay)
+    # Segments pointing straight at the origin cover no directions
+    if a == b:
+        return
+    if a > b:
+        a, b = b, a
+    k = len(segments)
+    segments.append((ax, ay, bx - ax, by - ay))
+    events.append((a, True, k))
+    events.append((b, False, k))
+
+# Cut a segment down to the part inside the square of 2*r around the origin (Liang-Barsky),
+# None if it is all outside. The sweep only stops at endpoints, so walls mustn't cross the square.
+def clip_segment(ax, ay, bx, by, r):
+    t1, t2 = 0, 1
+    ex = bx - ax
+    ey = by - ay
+    for p, q in ((-ex, ax + r), (ex, r - ax), (-ey, ay + r), (ey, r - ay)):
+        if p == 0:
+            if q < 0:
+                return None
+        else:
+            t = q / p
+            if p < 0:
+                t1 = max(t1, t)
+            else:
+                t2 = min(t2, t)
+    if t1 >= t2:
+        return None
+    return ax + ex * t1, ay + ey * t1, ax + ex * t2, ay + ey * t2
+
+# Distance along the direction (dx, dy) to the closest of the segments
+def get_nearest(segments, dx, dy):
+    nearest = math.inf
+    for ax, ay, ex, ey in segments:
+        denom = dx * ey - dy * ex
+        if denom:
+            t = (ax * ey - ay * ex) / denom
+            if 0 <= t < nearest:
+                nearest = t
+    return nearest
+
+# Find the area that can be seen from the origin within a square of 2*reach,
+# returned as a star shaped polygon around the origin.
+#
+# Sweeps a ray once around the origin, only stopping where a wall starts or ends. The walls the
+# ray is crossing are kept in an active set, so each stop only looks at those few walls to find
+# the closest one before and after the stop.
+# https://www.redblobgames.com/articles/visibility/
+def compute_visibility(game_map, origin, reach):
+    ox, oy = origin
+    r = reach
+    # Bounding box so every direction hits something
+    walls = [(-r, -r, r, -r), (r, -r, r, r), (r, r, -r, r), (-r, r, -r, -r)]
+    for ax, ay, ex, ey, nx, ny in game_map.query_segments(ox - r, oy - r, ox + r, oy + r):
+        # Walls facing away from the origin can never be the first thing a ray hits
+        if (ox - ax) * nx + (oy - ay) * ny <= EPSILON:
+            continue
+        wall = clip_segment(ax - ox, ay - oy, ax + ex - ox, ay + ey - oy, r)
+        if wall:
+            walls.append(wall)
+
+    events = []
+    segments = []
+    for ax, ay, bx, by in walls:
+        # Walls crossing the cut to the left of the origin are split in two
+        if (ay < 0 < by) or (by < 0 < ay):
+            cx = ax + (bx - ax) * ay / (ay - by)
+            if cx < 0:
+                add_segment(events, segments, ax, ay, cx, 0.0)
+                add_segment(events, segments, cx, 0.0, bx, by)
+                continue
+        add_segment(events, segments, ax, ay, bx, by)
+    events.sort(key=lambda event: event[0])
+
+    polygon = []
+    active = {}
+    i = 0
+    while i < len(events):
+        angle = events[i][0]
+        dx = math.cos(angle)
+        dy = math.sin(angle)
+        # Closest wall just before this angle, then just after the walls starting and ending here
+        before = get_nearest(active.values(), dx, dy)
+        while i < len(events) and events[i][0] == angle:
+            _, starting, k = events[i]
+            if starting:
+                active[k] = segments[k]
+            else:
+                del active[k]
+            i += 1
+        after = get_nearest(active.values(), dx, dy)
+        if before < math.inf:
+            polygon.append((ox + dx * before, oy + dy * before))
+        if after < math.inf and abs(after - before) > EPSILON:
+            polygon.append((ox + dx * after, oy + dy * after))
+    return polygon
+
+# Clip any polygon with a convex polygon (Sutherland-Hodgman)
+def clip(polygon, convex):
+    # Make the clip polygon's winding consistent so "inside" is always on the same side
+    area = 0
+    for (ax, ay), (bx, by) in zip(convex, convex[1:] + convex[:1]):
+        area += ax * by - bx * ay
+    if area < 0:
+        convex = convex[::-1]
+
+    output = polygon
+    for (ax, ay), (bx, by) in zip(convex, convex[1:] + convex[:1]):
+        if not output:
+            break
+        ex = bx - ax
+        ey = by - ay
+        points = output
+        output = []
+        px, py = points[-1]
+        p_side = ex * (py - ay) - ey * (px - ax)
+        for qx, qy in points:
+            q_side = ex * (qy - ay) - ey * (qx - ax)
+            if q_side >= 0:
+                if p_side < 0:
+                    t = p_side / (p_side - q_side)
+                    output.append((px + (qx - px) * t, py + (qy - py) * t))
+                output.append((qx, qy))
+            elif p_side >= 0:
+                t = p_side / (p_side - q_side)
+                output.append((px + (qx - px) * t, py + (qy - py) * t))
+            px, py, p_side = qx, qy, q_side
+    return output
+
+# Check if a circle overlaps any (possibly concave) polygon
+def circle_overlaps(polygon, x, y, radius):
+    if len(polygon) < 3:
+        return False
+    inside = False
+    radius2 = radius * radius
+    for (ax, ay), (bx, by) in zip(polygon, polygon[1:] + polygon[:1]):
+        # Count edge crossings of a horizontal ray from the center
+        if (ay > y) != (by > y) and x < ax + (y - ay) * (bx - ax) / (by - ay):
+            inside = not inside
+        # Distance from the center to the edge
+        ex = bx - ax
+        ey = by - ay
+        l2 = ex * ex + ey * ey
+        t = ((x - ax) * ex + (y - ay) * ey) / l2 if l2 else 0
+        t = 0 if t < 0 else 1 if t > 1 else t
+        dx = ax + ex * t - x
+        dy = ay + ey * t - y
+        if dx * dx + dy * dy < radius2:
+            return True
+    return inside
+
+
+# Each viewer keeps its own visibility polygon, which is only recomputed
+# after the viewer has moved or turned more than a small amount
+class VisibilityCache:
+    def __init__(self, move_tolerance=4, turn_tolerance=math.radians(2)):
+        self.move_tolerance = move_tolerance
+        self.turn_tolerance = turn_tolerance
+        self.origin = None
+        self.angle = None
+        self.walls = []
+        self.polygon = []
+
+    def update(self, game_map, origin, angle, fov_points):
+        ox, oy = origin
+        moved = self.origin is None or abs(ox - self.origin[0]) > self.move_tolerance or abs(oy - self.origin[1]) > self.move_tolerance
+        if moved:
+            reach = max(math.hypot(x - ox, y - oy) for x, y in fov_points)
+            self.walls = compute_visibility(game_map, (ox, oy), reach)
+            self.origin = (ox, oy)
+
+        turned = self.angle is None or abs(math.atan2(math.sin(angle - self.angle), math.cos(angle - self.angle))) > self.turn_tolerance
+        if moved or turned:
+            # The walls are rotation independent, only the field of view has to be clipped again
+            self.polygon = clip(self.walls, fov_points)
+            self.angle = angle
+        return self.polygon
@@ -0,0 +1,36 @@
+import os, sys
+
+# The game modules start pygame and load sounds when imported
+os.environ["SDL_VIDEODRIVER"] = "dummy"
+os.environ["SDL_AUDIODRIVER"] = "dummy"
+sys.argv.append("-d")
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir, "src"))
+
+from tilemap import TiledMap
+
+# A map with only an occupancy grid, cells are 10 pixels wide
+def make_map(cols, rows, walls):
+    tilemap = TiledMap.__new__(TiledMap)
+    tilemap.occupancy_size = 10
+    tilemap.occupancy_x = 0
+    tilemap.occupancy_y = 0
+    tilemap.occupancy_cols = cols
+    tilemap.occupancy_rows = rows
+    tilemap.occupancy = bytearray(cols * rows)
+    for col, row in walls:
+        tilemap.occupancy[row * cols + col] = 1
+    return tilemap
+
+def test_trace_exact_diagonal_stops_at_end_cell():
+    # The line passes exactly through the corner between (0, 0) and (1, 1), the wall is past the end
+    tilemap = make_map(4, 4, [(2, 2)])
+    assert tilemap.trace(5, 5, 15, 15)
+    assert tilemap.line_of_sight((5, 5), (15, 15))
+
+def test_trace_exact_diagonal_blocked_at_end_cell():
+    tilemap = make_map(4, 4, [(1, 1)])
+    assert not tilemap.trace(5, 5, 15, 15)
+
+def test_trace_exact_diagonal_blocked_by_corner_neighbour():
+    tilemap = make_map(4, 4, [(1, 0)])
+    assert not tilemap.trace(5, 5, 15, 15)
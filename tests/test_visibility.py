@@ -0,0 +1,37 @@
+import os, sys
+
+# The game modules start pygame and load sounds when imported
+os.environ["SDL_VIDEODRIVER"] = "dummy"
+os.environ["SDL_AUDIODRIVER"] = "dummy"
+sys.argv.append("-d")
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir, "src"))
+
+import visibility
+
+# Stands in for a TiledMap, walls are (x1, y1, x2, y2, nx, ny) with the normal facing the viewer
+class Walls:
+    def __init__(self, walls):
+        self.segments = [(x1, y1, x2 - x1, y2 - y1, nx, ny) for x1, y1, x2, y2, nx, ny in walls]
+
+    def query_segments(self, x1, y1, x2, y2):
+        return self.segments
+
+def area(polygon):
+    return abs(sum(ax * by - bx * ay for (ax, ay), (bx, by) in zip(polygon, polygon[1:] + polygon[:1]))) / 2
+
+def test_open_square():
+    polygon = visibility.compute_visibility(Walls([]), (0, 0), 100)
+    assert abs(area(polygon) - 200 * 200) < 1e-6
+
+def test_wall_crossing_the_edge():
+    # A wall at x = 50 that runs past the top and bottom of the square hides everything behind it
+    polygon = visibility.compute_visibility(Walls([(50, -500, 50, 500, -1, 0)]), (0, 0), 100)
+    assert abs(area(polygon) - 150 * 200) < 1e-6
+    assert not visibility.circle_overlaps(polygon, 75, 0, 10)
+    assert visibility.circle_overlaps(polygon, 25, 0, 10)
+
+def test_wall_crossing_the_wrap_around():
+    # Same wall on the left, where the sweep's angles wrap around
+    polygon = visibility.compute_visibility(Walls([(-50, 500, -50, -500, 1, 0)]), (0, 0), 100)
+    assert abs(area(polygon) - 150 * 200) < 1e-6
+    assert not visibility.circle_overlaps(polygon, -75, 0, 10)